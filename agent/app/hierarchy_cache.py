@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import time
+import threading
+import logging
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HierarchyCache:
+    """Stale-while-revalidate cache of precomputed hierarchy views keyed by date_preset
+
+    Views younger than max_age are served as-is. Older views are still served
+    immediately while a background thread recomputes them. Views older than
+    max_stale (or missing) are computed synchronously, since serving them would
+    be misleading. Concurrent refreshes of the same preset are collapsed into one.
+
+    An optional digest function (e.g. an ETag) is evaluated once per refresh and
+    stored with the view, so conditional requests don't rehash it every time.
+
+    With a shared_dir, refreshed views are also written there so other worker
+    processes can serve them. Workers that don't keep the configured presets
+    warm themselves (warm=False) leave revalidating those to the worker that does.
+
+    Views of presets that aren't configured are computed on demand; at most
+    max_unconfigured of them are kept in memory, least recently served first out.
+
+    background, if given, returns a context manager that background
+    revalidations run in (e.g. to lower the priority of their Graph calls).
+    on_update, if given, is called with (preset, view) whenever a newer view
+    is computed here or loaded from another worker.
+    """
+
+    def __init__(self, compute: Callable[[str], Dict[str, Any]], presets: List[str],
+                 max_age: float = 300, max_stale: float = 3600,
+                 digest: Optional[Callable[[Dict[str, Any]], str]] = None,
+                 shared_dir: Optional[Path] = None, warm: bool = True,
+                 background: Optional[Callable[[], ContextManager]] = None,
+                 on_update: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 max_unconfigured: int = 4):
+        self.compute = compute
+        self.presets = presets
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.digest = digest
+        self.shared_dir = shared_dir
+        self.warm = warm
+        self.background = background
+        self.on_update = on_update
+        self.max_unconfigured = max_unconfigured
+        self.entries: Dict[str, Tuple[Dict[str, Any], float, Optional[str]]] = {}
+        self.errors: Dict[str, str] = {}
+        self._shared_mtimes: Dict[str, float] = {}
+        self._last_served: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        if shared_dir is not None:
+            shared_dir.mkdir(exist_ok=True, parents=True)
+
+    def _lock_for(self, preset: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(preset, threading.Lock())
+
+    def _shared_path(self, preset: str) -> Optional[Path]:
+        # date_preset comes from the query string; never let it escape shared_dir
+        if self.shared_dir is None or not re.fullmatch(r"[a-z0-9_]+", preset):
+            return None
+        return self.shared_dir / f"{preset}.json"
+
+    def _write_shared(self, preset: str, entry: Tuple[Dict[str, Any], float, Optional[str]]):
+        path = self._shared_path(preset)
+        if path is None:
+            return
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        data, computed_at, digest = entry
+        with open(tmp_path, "w") as f:
+            json.dump({"computed_at": computed_at, "digest": digest, "data": data}, f)
+        # Atomic on POSIX, so readers never see a half-written view
+        os.replace(tmp_path, path)
+        self._shared_mtimes[preset] = path.stat().st_mtime
+
+    def _load_shared(self, preset: str):
+        """Pick up a view another worker wrote, if it is newer than ours"""
+        path = self._shared_path(preset)
+        if path is None:
+            return
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if self._shared_mtimes.get(preset) == mtime:
+            return
+        try:
+            with open(path) as f:
+                shared = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read shared hierarchy view {preset}: {e}")
+            return
+        self._shared_mtimes[preset] = mtime
+        current = self.entries.get(preset)
+        if current is None or shared["computed_at"] > current[1]:
+            self.entries[preset] = (shared["data"], shared["computed_at"], shared.get("digest"))
+            self._notify(preset)
+
+    def _notify(self, preset: str):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(preset, self.entries[preset][0])
+        except Exception as e:
+            logger.warning(f"Hierarchy view listener failed for {preset}: {e}")
+
+    def age(self, preset: str) -> Optional[float]:
+        entry = self.entries.get(preset)
+        return time.time() - entry[1] if entry else None
+
+    def refresh(self, preset: str, wait: bool = True) -> bool:
+        """Recompute a view; returns False if another refresh was already running"""
+        lock = self._lock_for(preset)
+        if not lock.acquire(blocking=wait):
+            return False
+        try:
+            started = time.time()
+            # Another thread (or worker) may have refreshed it while we were waiting
+            self._load_shared(preset)
+            age = self.age(preset)
+            if wait and age is not None and age < self.max_age:
+                return True
+            data = self.compute(preset)
+            digest = self.digest(data) if self.digest else None
+            self.entries[preset] = (data, time.time(), digest)
+            self.errors.pop(preset, None)
+            self._notify(preset)
+            if self.shared_dir is not None:
+                self._write_shared(preset, self.entries[preset])
+            logger.info(f"Refreshed hierarchy view {preset} in {time.time() - started:.2f}s")
+            return True
+        except Exception as e:
+            self.errors[preset] = str(e)
+            logger.warning(f"Failed to refresh hierarchy view {preset}: {e}")
+            if wait:
+                raise
+            return False
+        finally:
+            lock.release()
+
+    def revalidate(self, preset: str):
+        """Refresh a view in the background unless a refresh is already in flight"""
+        if not self.warm and preset in self.presets:
+            return
+        if self._lock_for(preset).locked():
+            return
+        threading.Thread(target=self._refresh_in_background, args=(preset,), name=f"revalidate-{preset}", daemon=True).start()
+
+    def _refresh_in_background(self, preset: str):
+        with self.background() if self.background else nullcontext():
+            self.refresh(preset, wait=False)
+
+    def get(self, preset: str) -> Tuple[Dict[str, Any], float, Optional[str]]:
+        """Return (view, age_seconds, digest), computing or revalidating as needed"""
+        self._load_shared(preset)
+        age = self.age(preset)
+        if age is None or age > self.max_stale:
+            self.refresh(preset)
+        elif age > self.max_age:
+            self.revalidate(preset)
+        data, computed_at, digest = self.entries[preset]
+        self._last_served[preset] = time.time()
+        self._evict_unconfigured(keep=preset)
+        return data, time.time() - computed_at, digest
+
+    def _evict_unconfigured(self, keep: str):
+        """Drop the least recently served views of unconfigured presets beyond max_unconfigured"""
+        unconfigured = [p for p in list(self.entries) if p not in self.presets]
+        unconfigured.sort(key=lambda p: (p == keep, self._last_served.get(p, 0)))
+        for preset in unconfigured[:max(len(unconfigured) - self.max_unconfigured, 0)]:
+            self.entries.pop(preset, None)
+            self.errors.pop(preset, None)
+            self._last_served.pop(preset, None)
+            # Forget the shared file's mtime so the view is reloaded if it is asked for again
+            self._shared_mtimes.pop(preset, None)
+
+    def due_presets(self) -> List[str]:
+        """Configured presets that are missing or past max_age"""
+        return [p for p in self.presets if self.age(p) is None or self.age(p) > self.max_age]
+
+    def status(self) -> Dict[str, Any]:
+        for preset in self.presets:
+            self._load_shared(preset)
+        return {
+            preset: {
+                "age_seconds": round(self.age(preset), 1) if self.age(preset) is not None else None,
+                "error": self.errors.get(preset)
+            }
+            for preset in sorted(set(self.presets) | set(self.entries))
+        }
@@ -0,0 +1,116 @@
+import re
+import json
+import base64
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Effective statuses Graph accepts in campaign filtering
+# Reference: https://developers.facebook.com/docs/marketing-api/reference/ad-campaign-group/
+EFFECTIVE_STATUSES = {
+    "ACTIVE", "PAUSED", "DELETED", "ARCHIVED", "IN_PROCESS", "WITH_ISSUES",
+    "PENDING_REVIEW", "DISAPPROVED", "PREAPPROVED", "PENDING_BILLING_INFO",
+    "CAMPAIGN_PAUSED", "ADSET_PAUSED"
+}
+
+
+def parse_timestamp(value: str) -> int:
+    """Unix timestamp of an ISO date or datetime (UTC unless it has an offset)
+
+    Also accepts Graph's timestamp format, e.g. 2024-01-31T12:00:00+0000.
+    """
+    try:
+        parsed = datetime.fromisoformat(re.sub(r"([+-]\d{2})(\d{2})$", r"\1:\2", value.replace("Z", "+00:00")))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+class HierarchyFilters:
+    """Campaign filters for the hierarchical endpoints
+
+    The same filters are sent to Graph as a 'filtering' parameter when the
+    tree is fetched, and applied locally when it is served from the hierarchy
+    cache (or when Graph ignored them, e.g. on the fallback path). Ad sets and
+    ads are kept under every matching campaign.
+    """
+
+    def __init__(self, effective_status: Optional[List[str]] = None, campaign_ids: Optional[List[str]] = None,
+                 name: Optional[str] = None, updated_since: Optional[str] = None):
+        statuses = [s.upper() for s in effective_status or []]
+        unknown = [s for s in statuses if s not in EFFECTIVE_STATUSES]
+        if unknown:
+            raise ValueError(f"Unknown effective_status: {','.join(unknown)}")
+        self.effective_status = statuses
+        self.campaign_ids = list(campaign_ids or [])
+        self.name = name or None
+        self.updated_since = updated_since or None
+        self._updated_since_ts = parse_timestamp(updated_since) if updated_since else None
+
+    def __bool__(self) -> bool:
+        return bool(self.effective_status or self.campaign_ids or self.name or self.updated_since)
+
+    def to_graph_filtering(self) -> Optional[List[Dict[str, Any]]]:
+        """Graph 'filtering' clauses for the campaigns edge, or None without filters"""
+        clauses = []
+        if self.effective_status:
+            clauses.append({"field": "effective_status", "operator": "IN", "value": self.effective_status})
+        if self.campaign_ids:
+            clauses.append({"field": "id", "operator": "IN", "value": self.campaign_ids})
+        if self.name:
+            clauses.append({"field": "name", "operator": "CONTAIN", "value": self.name})
+        if self._updated_since_ts is not None:
+            clauses.append({"field": "updated_time", "operator": "GREATER_THAN", "value": self._updated_since_ts - 1})
+        return clauses or None
+
+    def required_fields(self) -> List[str]:
+        """Campaign fields matches() reads, which a field projection must not drop"""
+        fields = []
+        if self.effective_status:
+            fields.append("effective_status")
+        if self.name:
+            fields.append("name")
+        if self._updated_since_ts is not None:
+            fields.append("updated_time")
+        return fields
+
+    def matches(self, campaign: Dict[str, Any]) -> bool:
+        if self.effective_status and campaign.get("effective_status") not in self.effective_status:
+            return False
+        if self.campaign_ids and campaign.get("id") not in self.campaign_ids:
+            return False
+        if self.name and self.name.lower() not in (campaign.get("name") or "").lower():
+            return False
+        if self._updated_since_ts is not None:
+            updated_time = campaign.get("updated_time")
+            if not updated_time or parse_timestamp(updated_time) < self._updated_since_ts:
+                return False
+        return True
+
+    def apply(self, campaigns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [c for c in campaigns if self.matches(c)] if self else campaigns
+
+    def signature(self, *extra: Any) -> str:
+        """Short digest of the filters (plus e.g. date_preset), so a cursor can't be reused with other ones"""
+        canonical = json.dumps([self.effective_status, self.campaign_ids, self.name, self.updated_since, *extra],
+                               separators=(",", ":"), default=str)
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Opaque, URL-safe cursor for a position in a hierarchy listing"""
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, signature: str) -> Dict[str, Any]:
+    """Position encoded by encode_cursor; rejects cursors issued for other filters"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or position.get("s") != signature:
+        raise ValueError("Cursor does not match these filters")
+    return position
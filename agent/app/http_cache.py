@@ -0,0 +1,70 @@
+import json
+import hashlib
+from typing import Any, Iterable, Optional
+
+from fastapi import Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def compute_etag(content: Any) -> str:
+    """Weak ETag over the canonical JSON form of content
+
+    Weak because the same representation may be sent gzip-encoded or not.
+    """
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return f'W/"{hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def conditional_json(request: Request, payload: Any, etag: Optional[str] = None,
+                     etag_source: Any = None) -> Response:
+    """Return payload as JSON with an ETag, or a bodyless 304 if the client has it
+
+    Args:
+        etag: Precomputed ETag (e.g. cached alongside the payload)
+        etag_source: Part of the payload to hash when it contains volatile fields
+            such as timestamps that shouldn't invalidate the client's copy
+    """
+    if etag is None:
+        etag = compute_etag(payload if etag_source is None else etag_source)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves some paths uncompressed
+
+    The gzip responder doesn't flush the compressor per chunk, so a streamed
+    response would be held back until enough output accumulates; streaming
+    endpoints are listed in exclude_paths instead.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, compresslevel: int = 9,
+                 exclude_paths: Iterable[str] = ()):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
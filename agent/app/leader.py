@@ -0,0 +1,57 @@
+import os
+import logging
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; there the agent only supports a single worker
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Elects one leader among the agent's worker processes
+
+    The leader holds an exclusive flock on a file in the data directory for as
+    long as it lives. The OS releases the lock when the process dies, so another
+    worker retrying try_acquire() takes over without any stale-lock handling.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.held = False
+        self._file = None
+
+    def try_acquire(self) -> bool:
+        """Become the leader if no other worker is; never blocks"""
+        if self.held:
+            return True
+        if fcntl is None:
+            self.held = True
+            return True
+
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # Record the leader's pid for whoever is debugging a multi-worker agent
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        self.held = True
+        logger.info(f"Worker {os.getpid()} is now the leader")
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.held = False
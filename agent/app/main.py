@@ -1,26 +1,54 @@
+import time
+
+# Measured from the first line of this module; reported by /healthz
+IMPORT_STARTED = time.perf_counter()
+
 import asyncio
+import hmac
+import math
 import os
 import json
-import time
 import sys
-from datetime import datetime
-from typing import Any, Dict
+from itertools import islice
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 from pathlib import Path
+from zoneinfo import ZoneInfo
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 import httpx
 import requests
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 # Handle imports for both standalone and module execution
 try:
-    from .meta_client import MetaAPIClient
+    from .meta_client import MetaAPIClient, validate_date_preset, is_throttling_error, is_transient_error, is_transient_graph_error, THROTTLING_ERROR_CODES
+    from .profiler import StackSampler, ProfilerBusyError, MAX_DURATION_SECONDS
+    from .hierarchy_cache import HierarchyCache
+    from .hierarchy_filters import HierarchyFilters, decode_cursor, encode_cursor
+    from .http_cache import SelectiveGZipMiddleware, compute_etag, conditional_json, etag_matches
+    from .outbox import StatusOutbox
+    from .leader import LeaderLock
+    from .summary_index import SummaryIndex
+    from .scheduler import CallScheduler, current_priority, parse_priority
+    from .timeseries import TimeSeriesStore, LEVEL_ID_FIELDS, compute_deltas, fill_days, ingest_daily_insights, rollup_rows
 except ImportError:
     # If relative import fails, try absolute import
     sys.path.insert(0, str(Path(__file__).parent))
-    from meta_client import MetaAPIClient
+    from meta_client import MetaAPIClient, validate_date_preset, is_throttling_error, is_transient_error, is_transient_graph_error, THROTTLING_ERROR_CODES
+    from profiler import StackSampler, ProfilerBusyError, MAX_DURATION_SECONDS
+    from hierarchy_cache import HierarchyCache
+    from hierarchy_filters import HierarchyFilters, decode_cursor, encode_cursor
+    from http_cache import SelectiveGZipMiddleware, compute_etag, conditional_json, etag_matches
+    from outbox import StatusOutbox
+    from leader import LeaderLock
+    from summary_index import SummaryIndex
+    from scheduler import CallScheduler, current_priority, parse_priority
+    from timeseries import TimeSeriesStore, LEVEL_ID_FIELDS, compute_deltas, fill_days, ingest_daily_insights, rollup_rows
 
 
 # Load configuration from JSON file
@@ -62,27 +90,112 @@ def load_config():
         }
     }
 
-config = load_config()
-
-# Get CRM base URL - prefer config, then env var, then default to localhost
-CRM_BASE_URL = config.get("crm", {}).get("base_url") or os.getenv("CRM_BASE_URL", "http://localhost:8000")
-AGENT_ID = config.get("agent", {}).get("id") or config.get("crm", {}).get("agent_id") or os.getenv("AGENT_ID", "agt_dev")
-AGENT_TOKEN = config.get("agent", {}).get("token") or config.get("crm", {}).get("agent_token") or os.getenv("AGENT_TOKEN")
+# Agent state - populated by the lifespan handler when a worker starts, not at import time,
+# so importing this module is cheap and every uvicorn worker initializes itself
+config: Dict[str, Any] = {}
+CRM_BASE_URL = "http://localhost:8000"
+AGENT_ID = "agt_dev"
+AGENT_TOKEN: Optional[str] = None
+PROFILING_ENABLED = False
+HIERARCHY_PRESETS: List[str] = []
+SUMMARY_PRESET = "last_30d"
+HIERARCHY_MAX_AGE = 300.0
+HIERARCHY_MAX_STALE = 3600.0
+OUTBOX_ENABLED = True
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+TIMESERIES_ENABLED = False
+TIMESERIES_LEVELS: List[str] = []
+TIMESERIES_LOOKBACK_DAYS = 30
+TIMESERIES_REFRESH_DAYS = 3
+TIMESERIES_INTERVAL = 900
+ROLLUP_PUSH_ENABLED = True
+ROLLUP_PUSH_BATCH_SIZE = 500
 
 # Global variables that can be updated when config changes
 current_agent_id = AGENT_ID
 current_agent_token = AGENT_TOKEN
 
-def reload_config():
+SECRETS_DIR: Optional[Path] = None
+DATA_DIR: Optional[Path] = None
+cred_manager: Optional["CredentialManager"] = None
+meta_client: Optional[MetaAPIClient] = None
+call_scheduler: Optional[CallScheduler] = None
+summary_index: Optional[SummaryIndex] = None
+hierarchy_cache: Optional[HierarchyCache] = None
+status_outbox: Optional[StatusOutbox] = None
+timeseries_store: Optional[TimeSeriesStore] = None
+leader_lock: Optional[LeaderLock] = None
+observer: Optional[Observer] = None
+background_tasks: List[asyncio.Task] = []
+STARTUP_SECONDS: Optional[float] = None
+
+
+def configure(new_config: Dict[str, Any]):
+    """Derive the agent settings from a loaded config"""
+    global config, CRM_BASE_URL, AGENT_ID, AGENT_TOKEN, PROFILING_ENABLED
+    global HIERARCHY_PRESETS, HIERARCHY_MAX_AGE, HIERARCHY_MAX_STALE, SUMMARY_PRESET
+    global OUTBOX_ENABLED, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS
+    global TIMESERIES_ENABLED, TIMESERIES_LEVELS, TIMESERIES_LOOKBACK_DAYS, TIMESERIES_REFRESH_DAYS, TIMESERIES_INTERVAL
+    global ROLLUP_PUSH_ENABLED, ROLLUP_PUSH_BATCH_SIZE
+    global current_agent_id, current_agent_token
+    config = new_config
+    
+    # Get CRM base URL - prefer config, then env var, then default to localhost
+    CRM_BASE_URL = config.get("crm", {}).get("base_url") or os.getenv("CRM_BASE_URL", "http://localhost:8000")
+    AGENT_ID = config.get("agent", {}).get("id") or config.get("crm", {}).get("agent_id") or os.getenv("AGENT_ID", "agt_dev")
+    AGENT_TOKEN = config.get("agent", {}).get("token") or config.get("crm", {}).get("agent_token") or os.getenv("AGENT_TOKEN")
+    current_agent_id = AGENT_ID
+    current_agent_token = AGENT_TOKEN
+    
+    # Debug profiling surface - off unless explicitly enabled
+    PROFILING_ENABLED = bool(config.get("agent", {}).get("profiling_enabled")) or os.getenv("AGENT_PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+    
+    # Precomputed hierarchy views kept warm in the background (empty list disables warming)
+    hierarchy_config = config.get("agent", {}).get("hierarchy_cache", {})
+    if os.getenv("AGENT_HIERARCHY_PRESETS") is not None:
+        HIERARCHY_PRESETS = [p.strip() for p in os.getenv("AGENT_HIERARCHY_PRESETS", "").split(",") if p.strip()]
+    else:
+        HIERARCHY_PRESETS = hierarchy_config.get("presets", ["today", "yesterday", "last_7d", "last_30d"])
+    HIERARCHY_MAX_AGE = float(hierarchy_config.get("max_age_seconds", 300))
+    HIERARCHY_MAX_STALE = float(hierarchy_config.get("max_stale_seconds", 3600))
+    # The view whose spend and counts feed /meta/summary
+    SUMMARY_PRESET = hierarchy_config.get("summary_preset", "last_30d")
+    
+    # Ad set status writes go through a durable outbox unless disabled
+    outbox_config = config.get("agent", {}).get("status_outbox", {})
+    OUTBOX_ENABLED = outbox_config.get("enabled", True)
+    OUTBOX_BATCH_SIZE = min(int(outbox_config.get("batch_size", 50)), 50)
+    OUTBOX_MAX_ATTEMPTS = int(outbox_config.get("max_attempts", 8))
+    
+    # Daily (time_increment=1) insights history for trend rules - opt in, it adds Graph calls
+    timeseries_config = config.get("agent", {}).get("timeseries", {})
+    TIMESERIES_ENABLED = bool(timeseries_config.get("enabled", False))
+    TIMESERIES_LEVELS = timeseries_config.get("levels", ["campaign", "adset", "ad"])
+    TIMESERIES_LOOKBACK_DAYS = int(timeseries_config.get("lookback_days", 30))
+    TIMESERIES_REFRESH_DAYS = max(int(timeseries_config.get("refresh_days", 3)), 1)
+    TIMESERIES_INTERVAL = int(timeseries_config.get("interval_seconds", 900))
+    # Push the daily rows to the CRM as pre-aggregated DailyMetric rollups
+    ROLLUP_PUSH_ENABLED = bool(timeseries_config.get("push_rollups", True))
+    ROLLUP_PUSH_BATCH_SIZE = min(int(timeseries_config.get("push_batch_size", 500)), 1000)
+
+
+def apply_credentials(new_config: Dict[str, Any]) -> bool:
+    """Take the agent id and token from a loaded config; False if either is missing"""
     global current_agent_id, current_agent_token
+    current_agent_id = new_config["agent"]["id"]
+    current_agent_token = new_config["agent"]["token"]
+    
+    # Validate credentials
+    if not current_agent_id or not current_agent_token:
+        print(f"ERROR: Invalid credentials - agent_id='{current_agent_id}', token={'EMPTY' if not current_agent_token else 'SET'}")
+        return False
+    return True
+
+
+def reload_config():
     try:
-        new_config = load_config()
-        current_agent_id = new_config["agent"]["id"]
-        current_agent_token = new_config["agent"]["token"]
-        
-        # Validate credentials
-        if not current_agent_id or not current_agent_token:
-            print(f"ERROR: Invalid credentials - agent_id='{current_agent_id}', token={'EMPTY' if not current_agent_token else 'SET'}")
+        if not apply_credentials(load_config()):
             return False
             
         print(f"Config reloaded: agent_id={current_agent_id}, token={'*' * len(current_agent_token)}")
@@ -92,15 +205,6 @@ def reload_config():
         return False
 
 
-app = FastAPI(title="SM Agent", version="0.1.0")
-
-# Secret management - use /etc/sm-agent in Docker, ./secrets locally
-if os.path.exists("/etc/sm-agent"):
-    SECRETS_DIR = Path("/etc/sm-agent")
-else:
-    SECRETS_DIR = Path(__file__).parent.parent / "secrets"
-SECRETS_DIR.mkdir(exist_ok=True, parents=True)
-
 class CredentialManager:
     def __init__(self):
         self.credentials = {}
@@ -131,27 +235,6 @@ class CredentialManager:
             except Exception as e:
                 print(f"Failed to reload credentials for {account_id}: {e}")
 
-cred_manager = CredentialManager()
-
-# Initialize Meta API client
-# Try multiple config paths
-config_paths = [
-    '/app/config/meta_config.json',  # Docker
-    str(Path(__file__).parent.parent / 'config' / 'meta_config.json'),  # Local development
-    'config/meta_config.json',  # Current directory
-]
-
-meta_config_path = None
-for path in config_paths:
-    if os.path.exists(path):
-        meta_config_path = path
-        break
-
-if meta_config_path:
-    meta_client = MetaAPIClient(config_path=meta_config_path)
-else:
-    # Fallback: create client with default path (will use env vars)
-    meta_client = MetaAPIClient(config_path="config/meta_config.json")
 
 class CredentialFileHandler(FileSystemEventHandler):
     def on_modified(self, event):
@@ -159,10 +242,162 @@ class CredentialFileHandler(FileSystemEventHandler):
             account_id = Path(event.src_path).stem
             cred_manager.reload_credentials(account_id)
 
-# Start file watcher
-observer = Observer()
-observer.schedule(CredentialFileHandler(), str(SECRETS_DIR), recursive=False)
-observer.start()
+
+def build_hierarchy(date_preset: str, levels: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                    metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Fetch the campaign -> ad set -> ad tree and wrap it with summary counts"""
+    campaigns = meta_client.get_campaigns_detailed(
+        limit=100,
+        date_preset=date_preset,
+        levels=levels,
+        fields=fields,
+        metrics=metrics
+    )
+    return hierarchy_view(campaigns)
+
+
+def hierarchy_view(campaigns: List[Dict[str, Any]], last_updated: Optional[str] = None) -> Dict[str, Any]:
+    """Wrap a list of campaign trees with summary counts"""
+    return {
+        "campaigns": campaigns,
+        "summary": {
+            "total_campaigns": len(campaigns),
+            "total_ad_sets": sum(len(campaign.get("ad_sets", [])) for campaign in campaigns),
+            "total_ads": sum(
+                sum(len(ad_set.get("ads", [])) for ad_set in campaign.get("ad_sets", []))
+                for campaign in campaigns
+            )
+        },
+        "last_updated": last_updated or datetime.utcnow().isoformat() + "Z"
+    }
+
+
+def fetch_campaign_page(filters: HierarchyFilters, signature: str, cursor: Optional[Dict[str, Any]],
+                        page_size: Optional[int], date_preset: str, levels: Optional[List[str]] = None,
+                        fields: Optional[List[str]] = None, metrics: Optional[List[str]] = None):
+    """Fetch matching campaign trees from Graph with the filters pushed down
+    
+    Returns (campaigns, next_cursor). Without page_size every matching campaign
+    is returned and next_cursor is None.
+    """
+    filtering = filters.to_graph_filtering()
+    # The filters are applied again below, so the fields they read must be fetched
+    # even when the projection leaves them out; they are dropped again afterwards
+    added = [f for f in filters.required_fields() if f not in fields] if fields is not None else []
+    fields = fields + added if added else fields
+    if page_size:
+        campaigns, after = meta_client.get_campaigns_detailed_page(
+            page_size, (cursor or {}).get("a"), date_preset, levels, fields, metrics, filtering
+        )
+        next_cursor = encode_cursor({"a": after, "s": signature}) if after else None
+    else:
+        campaigns = meta_client.get_campaigns_detailed(100, date_preset, levels, fields, metrics, filtering)
+        next_cursor = None
+    # Graph already filtered, except on the fallback path; this is cheap either way
+    campaigns = filters.apply(campaigns)
+    if added:
+        for campaign in campaigns:
+            for entity in [campaign, *campaign.get("ad_sets", []),
+                           *(ad for ad_set in campaign.get("ad_sets", []) for ad in ad_set.get("ads", []))]:
+                for field in added:
+                    entity.pop(field, None)
+    return campaigns, next_cursor
+
+
+def update_summary_index(preset: str, view: Dict[str, Any]):
+    """Sync the summary index whenever a newer full view of SUMMARY_PRESET arrives"""
+    if preset == SUMMARY_PRESET:
+        summary_index.sync(view["campaigns"], preset)
+
+
+def hierarchy_etag(data: Dict[str, Any]) -> str:
+    """ETag of a hierarchy view, ignoring its last_updated timestamp"""
+    return compute_etag({k: v for k, v in data.items() if k != "last_updated"})
+
+
+def init_services():
+    """Create directories, clients and caches for this worker"""
+    global SECRETS_DIR, DATA_DIR, cred_manager, meta_client, hierarchy_cache, status_outbox, leader_lock, timeseries_store
+    global call_scheduler, summary_index
+    
+    # Secret management - use /etc/sm-agent in Docker, ./secrets locally
+    if os.path.exists("/etc/sm-agent"):
+        SECRETS_DIR = Path("/etc/sm-agent")
+    else:
+        SECRETS_DIR = Path(__file__).parent.parent / "secrets"
+    SECRETS_DIR.mkdir(exist_ok=True, parents=True)
+    
+    # Local state shared by all workers (write outbox, hierarchy views, leader lock)
+    # - use /var/lib/sm-agent in Docker, ./data locally
+    if os.path.exists("/var/lib/sm-agent"):
+        DATA_DIR = Path("/var/lib/sm-agent")
+    else:
+        DATA_DIR = Path(__file__).parent.parent / "data"
+    DATA_DIR.mkdir(exist_ok=True, parents=True)
+    
+    cred_manager = CredentialManager()
+    
+    # Every Graph call of this worker is admitted by priority: interactive requests,
+    # then rule executions, then background sync
+    call_scheduler = CallScheduler.from_config(config.get("agent", {}).get("scheduler"))
+    
+    # Reuse the config we already loaded instead of probing the config paths again
+    meta_client = MetaAPIClient(config=config, scheduler=call_scheduler)
+    
+    summary_index = SummaryIndex()
+    hierarchy_cache = HierarchyCache(
+        build_hierarchy, HIERARCHY_PRESETS, max_age=HIERARCHY_MAX_AGE, max_stale=HIERARCHY_MAX_STALE,
+        digest=hierarchy_etag, shared_dir=DATA_DIR / "views", warm=False,
+        background=lambda: call_scheduler.priority("sync"),
+        on_update=update_summary_index
+    )
+    status_outbox = StatusOutbox(DATA_DIR / "status_outbox.db", max_attempts=OUTBOX_MAX_ATTEMPTS)
+    timeseries_store = TimeSeriesStore(DATA_DIR / "timeseries.db")
+    leader_lock = LeaderLock(DATA_DIR / "leader.lock")
+
+
+def drain_status_outbox() -> int:
+    """Send one batch of due status writes to Meta; returns the number delivered"""
+    entries = status_outbox.due(limit=OUTBOX_BATCH_SIZE)
+    if not entries:
+        return 0
+    
+    try:
+        results = meta_client.batch_update_ad_set_status([(e["adset_id"], e["status"]) for e in entries])
+    except Exception as e:
+        # The whole batch failed, which says nothing about the individual writes
+        for entry in entries:
+            status_outbox.mark_failed(entry["adset_id"], entry["seq"], str(e))
+        if is_throttling_error(e):
+            status_outbox.delay_all(max(60, meta_client.regain_seconds()))
+        elif is_transient_error(e):
+            status_outbox.delay_all(30)
+        return 0
+    
+    delivered = 0
+    throttled = False
+    for entry, result in zip(entries, results):
+        if result["success"]:
+            status_outbox.mark_done(entry["adset_id"], entry["seq"])
+            summary_index.set_status(entry["adset_id"], entry["status"])
+            delivered += 1
+            continue
+        error = result["error"] or {}
+        throttled = throttled or error.get("code") in THROTTLING_ERROR_CODES
+        status_outbox.mark_failed(
+            entry["adset_id"],
+            entry["seq"],
+            f"Meta API Error {error.get('code', result['code'])}: {error.get('message', '')}",
+            retryable=is_transient_graph_error(error, result["code"])
+        )
+    
+    if throttled:
+        # Back off the whole queue instead of hammering a throttled account
+        # The batch response carries the usage headers, so regain_seconds is current
+        status_outbox.delay_all(max(60, meta_client.regain_seconds()))
+    if delivered:
+        print(f"Delivered {delivered} ad set status updates")
+    return delivered
 
 
 async def post(client: httpx.AsyncClient, path: str, json: Dict[str, Any] | None = None) -> httpx.Response:
@@ -218,18 +453,31 @@ async def pull_commands_loop():
             await asyncio.sleep(backoff)
 
 
+def fetch_sync_data() -> Optional[Dict[str, Any]]:
+    """Account info and the first campaigns, or None if Meta isn't reachable"""
+    # Test Meta connection
+    if not meta_client.test_connection():
+        return None
+    return {
+        # Get account info
+        "account_info": meta_client.get_ad_account_info(),
+        # Get campaigns
+        "campaigns": list(islice(meta_client.iter_campaigns(page_size=10), 10))
+    }
+
+
 async def sync_meta_data_loop():
     """Sync Meta data every 5 minutes"""
     async with httpx.AsyncClient() as client:
+        # Runs in its own task, so this only lowers the priority of this loop's calls
+        current_priority.set("sync")
         while True:
             try:
-                # Test Meta connection
-                if meta_client.test_connection():
-                    # Get account info
-                    account_info = meta_client.get_ad_account_info()
-                    
-                    # Get campaigns
-                    campaigns = meta_client.get_campaigns(limit=10)
+                # Graph calls block, so keep them off the event loop
+                fetched = await asyncio.to_thread(fetch_sync_data)
+                if fetched:
+                    account_info = fetched["account_info"]
+                    campaigns = fetched["campaigns"]
                     
                     # Send data to CRM
                     sync_data = {
@@ -251,24 +499,304 @@ async def sync_meta_data_loop():
             await asyncio.sleep(300)
 
 
-@app.on_event("startup")
-async def on_startup():
-    # Validate credentials at startup
-    if not reload_config():
+async def status_outbox_loop():
+    """Drain queued ad set status writes in batches"""
+    # Status writes are what users and rules wait on, so they are never queued behind sync
+    current_priority.set("interactive")
+    while True:
+        try:
+            delivered = await asyncio.to_thread(drain_status_outbox)
+        except Exception as e:
+            print(f"Status outbox error: {e}")
+            delivered = 0
+        # Keep going while full batches are flowing, otherwise let writes accumulate briefly
+        await asyncio.sleep(0 if delivered >= OUTBOX_BATCH_SIZE else 1)
+
+
+def account_timezone() -> ZoneInfo:
+    """The ad account's timezone as last seen by the ingestion (UTC until then)"""
+    timezone_name = timeseries_store.get_state("account_timezone")
+    return ZoneInfo(timezone_name) if timezone_name else ZoneInfo("UTC")
+
+
+def run_timeseries_ingestion() -> Dict[str, int]:
+    """Ingest daily insights up to today in the ad account's timezone"""
+    try:
+        account_info = meta_client.get_ad_account_info()
+        timezone_name = account_info.get("timezone_name")
+        if timezone_name:
+            # Only store names ZoneInfo can load, the series endpoint relies on them
+            ZoneInfo(timezone_name)
+            timeseries_store.set_state("account_timezone", timezone_name)
+        if account_info.get("currency"):
+            timeseries_store.set_state("account_currency", account_info["currency"])
+    except Exception as e:
+        print(f"Failed to get ad account timezone, using {account_timezone()}: {e}")
+    
+    counts = ingest_daily_insights(
+        meta_client,
+        timeseries_store,
+        TIMESERIES_LEVELS,
+        today=datetime.now(account_timezone()).date(),
+        lookback_days=TIMESERIES_LOOKBACK_DAYS,
+        refresh_days=TIMESERIES_REFRESH_DAYS
+    )
+    timeseries_store.set_state("last_ingested", datetime.utcnow().isoformat() + "Z")
+    return counts
+
+
+async def push_daily_rollups(client: httpx.AsyncClient) -> int:
+    """Send daily rows stored or refetched since the last push to the CRM, in batches
+    
+    The cursor only moves past a batch once the CRM accepted it, so a failed
+    push is resent on the next run. Refetched open days are sent again with
+    their revised values; the CRM upserts them.
+    """
+    account_currency = timeseries_store.get_state("account_currency")
+    if account_currency is None:
+        # Spend can't be converted to minor units without knowing the currency
+        return 0
+    pushed = 0
+    cursor = timeseries_store.get_cursor("crm")
+    while True:
+        rows = timeseries_store.changed_rows(cursor, ROLLUP_PUSH_BATCH_SIZE)
+        if not rows:
+            break
+        response = await post(client, f"/api/agents/{current_agent_id}/metrics:daily", {
+            "meta_ad_account_id": meta_client.ad_account_id,
+            "rows": rollup_rows(rows, account_currency)
+        })
+        response.raise_for_status()
+        last = rows[-1]
+        cursor = (last["fetched_at"], last["level"], last["entity_id"], last["date"])
+        timeseries_store.set_cursor("crm", cursor)
+        pushed += len(rows)
+    return pushed
+
+
+async def timeseries_loop():
+    """Keep the daily insights history up to date"""
+    current_priority.set("sync")
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                counts = await asyncio.to_thread(run_timeseries_ingestion)
+                print(f"Ingested daily insights: {counts}")
+            except Exception as e:
+                print(f"Failed to ingest daily insights: {e}")
+            if ROLLUP_PUSH_ENABLED:
+                try:
+                    pushed = await push_daily_rollups(client)
+                    if pushed:
+                        print(f"Pushed {pushed} daily rollups to CRM")
+                except Exception as e:
+                    print(f"Failed to push daily rollups: {e}")
+            await asyncio.sleep(TIMESERIES_INTERVAL)
+
+
+async def hierarchy_refresh_loop():
+    """Keep precomputed hierarchy views for the configured presets warm"""
+    current_priority.set("sync")
+    while True:
+        for preset in hierarchy_cache.due_presets():
+            try:
+                await asyncio.to_thread(hierarchy_cache.refresh, preset, False)
+            except Exception as e:
+                print(f"Failed to refresh hierarchy view {preset}: {e}")
+        await asyncio.sleep(30)
+
+
+def start_leader_duties():
+    """Run the file watcher and background loops; only the leader worker does this"""
+    global observer
+    observer = Observer()
+    observer.schedule(CredentialFileHandler(), str(SECRETS_DIR), recursive=False)
+    observer.start()
+    
+    hierarchy_cache.warm = True
+    background_tasks.append(asyncio.create_task(heartbeat_loop()))
+    background_tasks.append(asyncio.create_task(pull_config_loop()))
+    background_tasks.append(asyncio.create_task(pull_commands_loop()))
+    background_tasks.append(asyncio.create_task(sync_meta_data_loop()))
+    if HIERARCHY_PRESETS:
+        background_tasks.append(asyncio.create_task(hierarchy_refresh_loop()))
+    if OUTBOX_ENABLED:
+        background_tasks.append(asyncio.create_task(status_outbox_loop()))
+    if TIMESERIES_ENABLED:
+        background_tasks.append(asyncio.create_task(timeseries_loop()))
+
+
+async def leader_election_loop():
+    """Followers take over leader duties when the leader worker goes away"""
+    while not leader_lock.try_acquire():
+        await asyncio.sleep(15)
+    print(f"Worker {os.getpid()} took over as leader")
+    start_leader_duties()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global STARTUP_SECONDS
+    started = time.perf_counter()
+    startup_config = load_config()
+    configure(startup_config)
+    
+    # Validate credentials at startup, from the config just loaded rather than probing the paths again
+    try:
+        credentials_valid = apply_credentials(startup_config)
+    except Exception as e:
+        print(f"Failed to read credentials from config: {e}")
+        credentials_valid = False
+    if not credentials_valid:
         print("ERROR: Invalid credentials at startup. Agent will not start.")
-        import sys
         sys.exit(1)  # Exit the entire process
-        
-    print(f"Agent starting with valid credentials: agent_id={current_agent_id}")
-    asyncio.create_task(heartbeat_loop())
-    asyncio.create_task(pull_config_loop())
-    asyncio.create_task(pull_commands_loop())
-    asyncio.create_task(sync_meta_data_loop())
+    
+    init_services()
+    if leader_lock.try_acquire():
+        role = "leader"
+        start_leader_duties()
+    else:
+        role = "follower"
+        background_tasks.append(asyncio.create_task(leader_election_loop()))
+    
+    STARTUP_SECONDS = time.perf_counter() - started
+    print(
+        f"Agent worker {os.getpid()} starting as {role} with valid credentials: agent_id={current_agent_id} "
+        f"(import {IMPORT_SECONDS:.3f}s, startup {STARTUP_SECONDS:.3f}s)"
+    )
+    
+    yield
+    
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    if observer is not None:
+        observer.stop()
+        observer.join()
+    leader_lock.release()
+
+
+app = FastAPI(title="SM Agent", version="0.1.0", lifespan=lifespan)
+# NDJSON streams are sent uncompressed so each row reaches the client as soon as it is written
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, exclude_paths={"/meta/insights/stream"})
+
+
+def is_debug_authorized(request: Request) -> bool:
+    """Debug endpoints require the agent's own bearer token"""
+    auth_header = request.headers.get("authorization", "")
+    if not current_agent_token or not auth_header.startswith("Bearer "):
+        return False
+    return hmac.compare_digest(auth_header[7:], current_agent_token)
+
+
+def render_profile(sampler: StackSampler, fmt: str):
+    if fmt == "collapsed":
+        return PlainTextResponse(sampler.collapsed())
+    return JSONResponse({"status": "success", "data": sampler.summary()})
+
+
+@app.middleware("http")
+async def call_priority_middleware(request: Request, call_next):
+    """Run the request's Graph calls at the priority named in X-Request-Priority
+
+    The backend sends 'rule' for automated rule executions; anything else is
+    treated as interactive.
+    """
+    current_priority.set(parse_priority(request.headers.get("x-request-priority")))
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def profile_request_middleware(request: Request, call_next):
+    """Profile a single request when it carries an X-Debug-Profile header
+
+    The header value selects the output format ('collapsed' for flame graphs,
+    'json' for a top-functions summary). The profile replaces the response body;
+    the original status code is returned in X-Profiled-Status.
+    """
+    fmt = request.headers.get("x-debug-profile")
+    if not fmt or not PROFILING_ENABLED or not is_debug_authorized(request):
+        return await call_next(request)
+
+    try:
+        sampler = StackSampler(interval_ms=float(request.headers.get("x-debug-profile-interval-ms", 10)))
+    except ValueError:
+        return JSONResponse(
+            {"status": "error", "message": "X-Debug-Profile-Interval-Ms must be a number of milliseconds"},
+            status_code=400
+        )
+    try:
+        sampler.start()
+    except ProfilerBusyError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=409)
+    try:
+        response = await call_next(request)
+        # Drain the body so serialization is part of the profile
+        async for _ in response.body_iterator:
+            pass
+    finally:
+        sampler.stop()
+
+    profiled = render_profile(sampler, fmt)
+    profiled.headers["X-Profiled-Status"] = str(response.status_code)
+    return profiled
+
+
+@app.post("/debug/profile")
+async def profile_window(request: Request, seconds: float = 10, interval_ms: float = 10, format: str = "json"):
+    """Sample every agent thread for a time window and return the profile
+
+    Args:
+        seconds: Length of the window (capped at MAX_DURATION_SECONDS)
+        interval_ms: Sampling interval in milliseconds
+        format: 'json' for a top-functions summary, 'collapsed' for flame graph input
+    """
+    if not PROFILING_ENABLED:
+        return JSONResponse({"status": "error", "message": "Not found"}, status_code=404)
+    if not is_debug_authorized(request):
+        return JSONResponse({"status": "error", "message": "Invalid agent token"}, status_code=401)
+
+    if not math.isfinite(seconds):
+        return JSONResponse({"status": "error", "message": "seconds must be a finite number"}, status_code=400)
+    try:
+        sampler = StackSampler(interval_ms=interval_ms)
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+    try:
+        sampler.start()
+    except ProfilerBusyError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=409)
+    try:
+        await asyncio.sleep(min(max(seconds, 0), MAX_DURATION_SECONDS))
+    finally:
+        sampler.stop()
+
+    return render_profile(sampler, format)
+
+
+def parse_csv(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma separated query parameter; 'none' or '' yields an empty list"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip() and item.strip() != "none"]
 
 
 @app.get("/healthz")
 def healthz():
-    return {"status": "ok", "time": datetime.utcnow().isoformat() + "Z"}
+    return {
+        "status": "ok",
+        "time": datetime.utcnow().isoformat() + "Z",
+        "worker": {
+            "pid": os.getpid(),
+            "role": "leader" if leader_lock is not None and leader_lock.held else "follower",
+            "import_seconds": round(IMPORT_SECONDS, 3),
+            "startup_seconds": round(STARTUP_SECONDS, 3) if STARTUP_SECONDS is not None else None
+        },
+        "meta_api": {
+            "usage": meta_client.usage if meta_client else {},
+            **(meta_client.stats if meta_client else {})
+        }
+    }
 
 @app.get("/meta/test")
 def test_meta_connection():
@@ -291,10 +819,14 @@ def get_meta_account():
         return {"status": "error", "message": f"Failed to get app info: {str(e)}"}
 
 @app.get("/meta/campaigns")
-def get_meta_campaigns():
-    """Get Meta campaigns"""
+def get_meta_campaigns(fields: Optional[str] = None):
+    """Get Meta campaigns
+    
+    Args:
+        fields: Comma separated campaign fields to return (default: all)
+    """
     try:
-        campaigns = meta_client.get_campaigns()
+        campaigns = meta_client.get_campaigns(fields=parse_csv(fields))
         return {"status": "success", "data": campaigns}
     except Exception as e:
         return {"status": "error", "message": f"Failed to get campaigns: {str(e)}"}
@@ -308,41 +840,148 @@ def get_meta_insights():
     except Exception as e:
         return {"status": "error", "message": f"Failed to get insights: {str(e)}"}
 
+@app.get("/meta/insights/stream")
+async def stream_meta_insights(level: str = "ad", date_preset: str = "last_30d", since: Optional[str] = None,
+                               until: Optional[str] = None, daily: bool = False, fields: Optional[str] = None):
+    """Stream insights rows as NDJSON (one JSON object per line), page by page
+    
+    Rows are written as soon as each page arrives, and the next page is
+    requested while the current one is being sent, so large ad-level reports
+    never have to be held in memory.
+    
+    Args:
+        level: 'account', 'campaign', 'adset' or 'ad'
+        date_preset: Date range preset, used unless since and until are given
+        since/until: Explicit date range (YYYY-MM-DD, inclusive)
+        daily: One row per entity per day
+        fields: Comma separated insights fields (default: ids plus standard metrics)
+    """
+    rows = meta_client.aiter_insights(
+        level,
+        date_preset=date_preset,
+        since=since,
+        until=until,
+        time_increment=1 if daily else None,
+        fields=parse_csv(fields)
+    )
+    try:
+        # Pull the first row before answering so bad parameters and auth errors still get a JSON error
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to get insights: {str(e)}"}
+    
+    async def ndjson():
+        try:
+            if first is not None:
+                yield json.dumps(first) + "\n"
+                async for row in rows:
+                    yield json.dumps(row) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the failure in-band as the last line
+            yield json.dumps({"error": f"Failed to get insights: {str(e)}"}) + "\n"
+        finally:
+            await rows.aclose()
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.get("/meta/campaigns/hierarchical")
-def get_hierarchical_campaigns(date_preset: str = "last_30d"):
+def get_hierarchical_campaigns(request: Request, date_preset: str = "last_30d", levels: Optional[str] = None,
+                               fields: Optional[str] = None, metrics: Optional[str] = None,
+                               fresh: bool = False, effective_status: Optional[str] = None,
+                               campaign_ids: Optional[str] = None, name: Optional[str] = None,
+                               updated_since: Optional[str] = None, page_size: Optional[int] = None,
+                               cursor: Optional[str] = None):
     """Get campaigns with hierarchical structure (campaigns -> ad sets -> ads)
     
+    Full (unprojected) views are served from the precomputed hierarchy cache;
+    'cache.age_seconds' tells how old the served view is. Responses carry an
+    ETag and If-None-Match is answered with 304 when the tree is unchanged.
+    
+    Filters select campaigns (with all their ad sets and ads). They are sent to
+    Meta as a filtering parameter when the tree is fetched, and applied to the
+    cached view otherwise. With page_size, 'paging.cursor' fetches the next
+    page; pass it back with the same filters.
+    
     Args:
         date_preset: Date range for insights (e.g., 'last_30d', 'today', 'yesterday', 'last_7d')
+        levels: Comma separated levels to fetch (campaigns,adsets,ads), e.g. 'campaigns,adsets' skips ads
+        fields: Comma separated entity fields to keep at every level (id is always returned)
+        metrics: Comma separated insights metrics (e.g. 'spend,impressions'), or 'none' to skip insights
+        fresh: Bypass the cache and fetch from Meta
+        effective_status: Comma separated campaign effective statuses (e.g. 'ACTIVE,PAUSED')
+        campaign_ids: Comma separated campaign ids
+        name: Case-insensitive substring of the campaign name
+        updated_since: ISO date or datetime; only campaigns updated at or after it
+        page_size: Campaigns per page (default: all)
+        cursor: Opaque cursor from a previous page
     """
     try:
-        campaigns = meta_client.get_campaigns_detailed(limit=100, date_preset=date_preset)
+        # Every preset asked for here may end up as a cached view, so only take Graph's own
+        validate_date_preset(date_preset)
+        filters = HierarchyFilters(parse_csv(effective_status), parse_csv(campaign_ids), name, updated_since)
+        if page_size is not None and page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        signature = filters.signature(date_preset, levels, fields, metrics, page_size)
+        position = decode_cursor(cursor, signature) if cursor else None
         
-        # Format the response in a clean hierarchical structure
-        hierarchical_data = {
-            "status": "success",
-            "data": {
-                "campaigns": campaigns,
-                "summary": {
-                    "total_campaigns": len(campaigns),
-                    "total_ad_sets": sum(len(campaign.get("ad_sets", [])) for campaign in campaigns),
-                    "total_ads": sum(
-                        sum(len(ad_set.get("ads", [])) for ad_set in campaign.get("ad_sets", []))
-                        for campaign in campaigns
-                    )
-                },
-                "last_updated": datetime.utcnow().isoformat() + "Z"
-            }
+        projected = levels is not None or fields is not None or metrics is not None
+        # A cursor continues on the path that issued it: Graph paging ("a") or the cached view ("o")
+        from_graph = "a" in position if position else fresh or projected
+        if from_graph:
+            campaigns, next_cursor = fetch_campaign_page(
+                filters, signature, position, page_size, date_preset,
+                parse_csv(levels), parse_csv(fields), parse_csv(metrics)
+            )
+            data = hierarchy_view(campaigns)
+            if not page_size:
+                return conditional_json(request, {"status": "success", "data": data}, etag=hierarchy_etag(data))
+            paging = {"cursor": next_cursor, "has_more": next_cursor is not None, "total": None}
+            return conditional_json(request, {"status": "success", "data": data, "paging": paging},
+                                    etag_source={"campaigns": campaigns, "paging": paging})
+        
+        view, age, etag = hierarchy_cache.get(date_preset)
+        cache_info = {
+            "age_seconds": round(age, 1),
+            "max_age_seconds": hierarchy_cache.max_age,
+            "stale": age > hierarchy_cache.max_age
         }
+        if not filters and not page_size:
+            return conditional_json(request, {"status": "success", "data": view, "cache": cache_info}, etag=etag)
         
-        return hierarchical_data
+        matching = filters.apply(view["campaigns"])
+        offset = (position or {}).get("o", 0)
+        end = offset + page_size if page_size else len(matching)
+        data = hierarchy_view(matching[offset:end], last_updated=view.get("last_updated"))
+        next_cursor = encode_cursor({"o": end, "s": signature}) if end < len(matching) else None
+        paging = {"cursor": next_cursor, "has_more": next_cursor is not None, "total": len(matching)}
+        return conditional_json(request, {"status": "success", "data": data, "paging": paging, "cache": cache_info},
+                                etag_source={"campaigns": data["campaigns"], "paging": paging})
     except Exception as e:
         return {"status": "error", "message": f"Failed to get hierarchical campaigns: {str(e)}"}
 
+@app.get("/meta/campaigns/hierarchical/cache")
+def get_hierarchy_cache_status():
+    """Age and last refresh error of each precomputed hierarchy view"""
+    return {"status": "success", "data": hierarchy_cache.status()}
+
 @app.get("/meta/test/hierarchical")
-def test_hierarchical_structure():
-    """Test endpoint to verify Meta API integration with detailed hierarchical display"""
+def test_hierarchical_structure(request: Request, effective_status: Optional[str] = None,
+                                campaign_ids: Optional[str] = None, name: Optional[str] = None,
+                                updated_since: Optional[str] = None, page_size: Optional[int] = None,
+                                cursor: Optional[str] = None):
+    """Test endpoint to verify Meta API integration with detailed hierarchical display
+    
+    Accepts the same filters and paging as /meta/campaigns/hierarchical.
+    """
     try:
+        filters = HierarchyFilters(parse_csv(effective_status), parse_csv(campaign_ids), name, updated_since)
+        if page_size is not None and page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        signature = filters.signature("test", page_size)
+        position = decode_cursor(cursor, signature) if cursor else None
+        
         # Test connection first
         if not meta_client.test_connection():
             return {"status": "error", "message": "Meta API connection failed"}
@@ -351,7 +990,7 @@ def test_hierarchical_structure():
         account_info = meta_client.get_ad_account_info()
         
         # Get campaigns with full hierarchy
-        campaigns = meta_client.get_campaigns_detailed(limit=100)
+        campaigns, next_cursor = fetch_campaign_page(filters, signature, position, page_size, "last_30d")
         
         # Create detailed hierarchical display
         hierarchical_display = {
@@ -427,7 +1066,9 @@ def test_hierarchical_structure():
             
             hierarchical_display["hierarchical_structure"]["campaigns"].append(campaign_data)
         
-        return hierarchical_display
+        if page_size:
+            hierarchical_display["paging"] = {"cursor": next_cursor, "has_more": next_cursor is not None}
+        return conditional_json(request, hierarchical_display)
         
     except Exception as e:
         return {
@@ -471,17 +1112,26 @@ def test_simple_campaigns():
         }
 
 @app.get("/meta/campaigns/{campaign_id}/adsets")
-def get_campaign_adsets(campaign_id: str):
-    """Get ad sets for a specific campaign"""
+def get_campaign_adsets(request: Request, campaign_id: str, fields: Optional[str] = None, metrics: Optional[str] = None,
+                        date_preset: str = "last_30d"):
+    """Get ad sets for a specific campaign
+    
+    Args:
+        fields: Comma separated ad set fields to return (default: all)
+        metrics: Comma separated insights metrics to include as performance_metrics (default: none)
+        date_preset: Date range for insights when metrics are requested
+    """
     try:
         # Test connection first
         if not meta_client.test_connection():
             return {"status": "error", "message": "Meta API connection failed"}
         
         # Get ad sets for the specific campaign
-        ad_sets = meta_client.get_ad_sets(campaign_id, limit=50)
+        ad_sets = meta_client.get_ad_sets(
+            campaign_id, limit=50, fields=parse_csv(fields), metrics=parse_csv(metrics), date_preset=date_preset
+        )
         
-        return {
+        return conditional_json(request, {
             "status": "success",
             "message": f"Ad sets for campaign {campaign_id}",
             "campaign_id": campaign_id,
@@ -492,7 +1142,7 @@ def get_campaign_adsets(campaign_id: str):
                 "paused_ad_sets": len([ads for ads in ad_sets if ads.get("status") == "PAUSED"]),
                 "archived_ad_sets": len([ads for ads in ad_sets if ads.get("status") == "ARCHIVED"])
             }
-        }
+        })
         
     except Exception as e:
         return {
@@ -501,16 +1151,50 @@ def get_campaign_adsets(campaign_id: str):
             "error_details": str(e)
         }
 
+@app.get("/meta/objects")
+def get_meta_objects(request: Request, ids: str, fields: Optional[str] = None, metrics: Optional[str] = None,
+                     date_preset: str = "last_30d"):
+    """Get specific campaigns, ad sets or ads by id
+    
+    Args:
+        ids: Comma separated object ids (levels may be mixed)
+        fields: Comma separated fields to return (default: id, name, status, effective_status, created/updated time)
+        metrics: Comma separated insights metrics to include as performance_metrics (default: none)
+        date_preset: Date range for insights when metrics are requested
+    """
+    try:
+        requested = parse_csv(ids) or []
+        objects, errors = meta_client.get_objects(
+            requested, fields=parse_csv(fields), metrics=parse_csv(metrics), date_preset=date_preset
+        )
+        return conditional_json(request, {
+            "status": "success",
+            "data": objects,
+            "missing": [i for i in requested if i not in objects],
+            "errors": errors
+        })
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to get objects: {str(e)}"}
+
 @app.get("/meta/adsets/{adset_id}/ads")
-def get_adset_ads(adset_id: str):
-    """Get ads for a specific ad set"""
+def get_adset_ads(adset_id: str, fields: Optional[str] = None, metrics: Optional[str] = None,
+                  date_preset: str = "last_30d"):
+    """Get ads for a specific ad set
+    
+    Args:
+        fields: Comma separated ad fields to return (default: all)
+        metrics: Comma separated insights metrics to include as performance_metrics (default: none)
+        date_preset: Date range for insights when metrics are requested
+    """
     try:
         # Test connection first
         if not meta_client.test_connection():
             return {"status": "error", "message": "Meta API connection failed"}
         
         # Get ads for the specific ad set
-        ads = meta_client.get_ads(adset_id, limit=50)
+        ads = meta_client.get_ads(
+            adset_id, limit=50, fields=parse_csv(fields), metrics=parse_csv(metrics), date_preset=date_preset
+        )
         
         return {
             "status": "success",
@@ -536,13 +1220,16 @@ class AdSetStatusUpdate(BaseModel):
     status: str
 
 @app.put("/meta/adsets/{adset_id}/status")
-def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate):
-    """Update the status of an ad set"""
+def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate, sync: bool = False):
+    """Update the status of an ad set
+    
+    By default the write is stored in the durable outbox and acknowledged
+    immediately; it is delivered to Meta in the background (see /meta/outbox).
+    
+    Args:
+        sync: Write to Meta before responding instead of queueing
+    """
     try:
-        # Test connection first
-        if not meta_client.test_connection():
-            return {"status": "error", "message": "Meta API connection failed"}
-        
         status = status_data.status
         if not status:
             return {"status": "error", "message": "Status is required"}
@@ -550,14 +1237,37 @@ def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate):
         if status not in ["ACTIVE", "PAUSED", "ARCHIVED"]:
             return {"status": "error", "message": "Invalid status. Must be ACTIVE, PAUSED, or ARCHIVED"}
         
+        if OUTBOX_ENABLED and not sync:
+            entry = status_outbox.enqueue(adset_id, status)
+            # Count the queued write right away; the outbox delivers it
+            summary_index.set_status(adset_id, status)
+            return {
+                "status": "success",
+                "message": f"Ad set {adset_id} status update to {status} queued",
+                "adset_id": adset_id,
+                "new_status": status,
+                "queued": True,
+                "data": entry
+            }
+        
+        # Test connection first
+        if not meta_client.test_connection():
+            return {"status": "error", "message": "Meta API connection failed"}
+        
+        # This write is newer than anything still queued for the ad set, so the
+        # outbox must not deliver an older status over it later
+        superseded = status_outbox.cancel(adset_id)
+
         # Update the ad set status
         result = meta_client.update_ad_set_status(adset_id, status)
-        
+        summary_index.set_status(adset_id, status)
+
         return {
             "status": "success",
             "message": f"Ad set {adset_id} status updated to {status}",
             "adset_id": adset_id,
             "new_status": status,
+            "superseded_queued_write": superseded,
             "data": result
         }
         
@@ -584,6 +1294,91 @@ def update_adset_status(adset_id: str, status_data: AdSetStatusUpdate):
             "error_details": error_details
         }
 
+@app.get("/meta/timeseries")
+def get_timeseries(level: str = "adset", ids: Optional[str] = None, campaign_id: Optional[str] = None,
+                   days: int = 14, compare_days: int = 7):
+    """Daily insights series with period-over-period deltas and trends
+    
+    Served from the locally ingested history, no Graph calls are made.
+    
+    Args:
+        level: 'campaign', 'adset' or 'ad'
+        ids: Comma separated entity ids (default: all entities at this level)
+        campaign_id: Only entities belonging to this campaign
+        days: Window length, ending today in the ad account's timezone
+        compare_days: Length of the periods compared for percent_change
+    """
+    if level not in LEVEL_ID_FIELDS:
+        return {"status": "error", "message": f"Invalid level. Must be one of {', '.join(LEVEL_ID_FIELDS)}"}
+    if not TIMESERIES_ENABLED:
+        return {"status": "error", "message": "Time series ingestion is disabled (agent.timeseries.enabled)"}
+    
+    try:
+        until = datetime.now(account_timezone()).date()
+        since = until - timedelta(days=max(days, 1) - 1)
+        series = timeseries_store.series(level, since.isoformat(), until.isoformat(), ids=parse_csv(ids), campaign_id=campaign_id)
+        
+        data = {}
+        for entity_id, points in series.items():
+            points = fill_days(points, since, until)
+            data[entity_id] = {"series": points, "deltas": compute_deltas(points, compare_days)}
+        
+        return {
+            "status": "success",
+            "level": level,
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "data": data,
+            "last_ingested": timeseries_store.get_state("last_ingested")
+        }
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to get time series: {str(e)}"}
+
+@app.get("/meta/summary")
+def get_account_summary(request: Request, include_campaigns: bool = True):
+    """Campaign, ad set and ad counts by status, and spend/impressions per campaign
+    
+    Read from an index kept up to date by hierarchy syncs and status writes,
+    so it doesn't fetch or walk the tree. Spend and impressions cover the
+    summary preset (agent.hierarchy_cache.summary_preset, default last_30d).
+    
+    Args:
+        include_campaigns: Include the per-campaign breakdown
+    """
+    try:
+        # Picks up a view the leader refreshed (a stat when nothing changed) and
+        # revalidates a stale one, which syncs the index through on_update
+        hierarchy_cache.get(SUMMARY_PRESET)
+        etag = summary_index.etag("" if include_campaigns else "-counts")
+        # Answer revalidations before building the snapshot
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        return conditional_json(request, {
+            "status": "success",
+            "data": summary_index.snapshot(include_campaigns)
+        }, etag=etag)
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to get summary: {str(e)}"}
+
+@app.get("/meta/scheduler")
+def get_call_scheduler():
+    """Queue depth, calls in flight and recent wait times per priority class"""
+    return {"status": "success", "data": call_scheduler.status()}
+
+@app.get("/meta/outbox")
+def get_status_outbox():
+    """Queued and failed ad set status writes"""
+    entries = status_outbox.entries()
+    return {
+        "status": "success",
+        "data": entries,
+        "summary": {
+            "pending": len([e for e in entries if e["state"] == "pending"]),
+            "failed": len([e for e in entries if e["state"] == "failed"]),
+            "superseded": len([e for e in entries if e["state"] == "superseded"])
+        }
+    }
+
 @app.post("/meta/campaigns")
 def create_meta_campaign(campaign_data: Dict[str, Any]):
     """Create a new Meta campaign"""
@@ -598,8 +1393,9 @@ def create_meta_campaign(campaign_data: Dict[str, Any]):
         return {"status": "error", "message": f"Failed to create campaign: {str(e)}"}
 
 
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=9000)
-
-
@@ -1,21 +1,229 @@
+import re
 import json
+import time
+import random
+import asyncio
+import threading
+import contextvars
 import requests
 import logging
-from typing import Dict, List, Optional, Any
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple
+from urllib.parse import quote, urlencode, urlsplit
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Default field lists per level; callers may project these down (see build_fields)
+CAMPAIGN_FIELDS = ["id", "name", "status", "effective_status", "objective", "created_time", "updated_time", "daily_budget", "lifetime_budget"]
+AD_SET_FIELDS = ["id", "name", "status", "effective_status", "daily_budget", "lifetime_budget", "optimization_goal", "created_time", "updated_time"]
+AD_FIELDS = ["id", "name", "status", "effective_status", "creative", "created_time", "updated_time"]
+INSIGHT_METRICS = ["spend", "impressions", "clicks", "ctr", "cpc", "cpm", "reach", "frequency", "actions", "cost_per_action"]
+LEVELS = ["campaigns", "adsets", "ads"]
+# Reference: https://developers.facebook.com/docs/marketing-api/insights/parameters/ (date_preset)
+DATE_PRESETS = [
+    "today", "yesterday", "this_month", "last_month", "this_quarter", "maximum", "data_maximum",
+    "last_3d", "last_7d", "last_14d", "last_28d", "last_30d", "last_90d", "last_week_mon_sun",
+    "last_week_sun_sat", "last_quarter", "last_year", "this_week_mon_today", "this_week_sun_today", "this_year"
+]
+# Fields every campaign, ad set and ad has, so mixed id lists can be read in one request
+OBJECT_FIELDS = ["id", "name", "status", "effective_status", "created_time", "updated_time"]
+# Graph's limit on ids per multi-object read
+MAX_IDS_PER_REQUEST = 50
+
+# Graph error codes that indicate a temporary condition (unknown/service errors,
+# app/user/account throttling) rather than a bad request
+# Reference: https://developers.facebook.com/docs/graph-api/guides/error-handling/
+TRANSIENT_ERROR_CODES = {1, 2, 4, 17, 32, 341, 613, 80000, 80003, 80004}
+# Subset of the above that means "slow down" rather than "try again"
+THROTTLING_ERROR_CODES = {4, 17, 32, 613, 80000, 80003, 80004}
+# Invalid or expired access token; no other request will fare better
+AUTH_ERROR_CODES = {102, 190}
+
+# Seconds a usage reading stays current; readings are only refreshed by new calls
+USAGE_MAX_AGE = 60
+
+# Error #100 of a multi-id read that names the ids that don't exist (or aren't readable)
+MISSING_IDS_PATTERN = re.compile(r"Some of the aliases you requested do not exist: (.+)")
+
+
+def build_fields(base_fields: List[str], fields: Optional[List[str]] = None,
+                 metrics: Optional[List[str]] = None, nested: Optional[str] = None) -> str:
+    """Build a Graph field expression for one level
+
+    Args:
+        base_fields: Fields available at this level
+        fields: Projection over base_fields (None = all). Fields that don't exist at
+            this level are skipped; 'id' is always included
+        metrics: Insights metrics to request (None = all, [] = skip insights)
+        nested: Already-built expression for a child edge, e.g. 'ads{...}'
+    """
+    if fields is None:
+        selected = list(base_fields)
+    else:
+        selected = ["id"] + [f for f in base_fields if f in fields and f != "id"]
+
+    if metrics is None:
+        metrics = INSIGHT_METRICS
+    if metrics:
+        selected.append(f"insights{{{','.join(metrics)}}}")
+
+    if nested:
+        selected.append(nested)
+    return ",".join(selected)
+
+
+def validate_projection(fields: Optional[List[str]] = None, metrics: Optional[List[str]] = None,
+                        levels: Optional[List[str]] = None):
+    """Reject projections Graph would fail on, before spending a request on them"""
+    known_fields = set(CAMPAIGN_FIELDS) | set(AD_SET_FIELDS) | set(AD_FIELDS)
+    unknown = [f for f in fields or [] if f not in known_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {','.join(unknown)}")
+    unknown = [m for m in metrics or [] if m not in INSIGHT_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {','.join(unknown)}")
+    unknown = [l for l in levels or [] if l not in LEVELS]
+    if unknown:
+        raise ValueError(f"Unknown levels: {','.join(unknown)}")
+
+
+def validate_date_preset(date_preset: str):
+    """Reject date presets Graph doesn't know
+
+    An unknown preset fails the detailed read, whose fallback then ignores it,
+    so it has to be caught before the request.
+    """
+    if date_preset not in DATE_PRESETS:
+        raise ValueError(f"Unknown date_preset: {date_preset}")
+
+
+def is_transient_graph_error(error: Optional[Dict[str, Any]], http_status: Optional[int] = None) -> bool:
+    """Classify a Graph error object (the 'error' key of a response body)"""
+    if http_status is not None and http_status >= 500:
+        return True
+    if not error:
+        return False
+    return bool(error.get("is_transient")) or error.get("code") in TRANSIENT_ERROR_CODES
+
+
+def graph_error(exc: Exception) -> Optional[Dict[str, Any]]:
+    """The Graph error object carried by a failed request, if any"""
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        try:
+            return exc.response.json().get("error")
+        except ValueError:
+            return None
+    return None
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """Whether a failed request is worth retrying"""
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return is_transient_graph_error(graph_error(exc), exc.response.status_code)
+    return False
+
+
+def is_throttling_error(exc: Exception) -> bool:
+    return (graph_error(exc) or {}).get("code") in THROTTLING_ERROR_CODES
+
+
+def parse_usage_headers(headers: Any) -> Dict[str, Any]:
+    """Rate limit usage reported by Graph, as percentages of the limits
+
+    Reads X-App-Usage, X-Ad-Account-Usage and X-Business-Use-Case-Usage. The
+    business use case header also says how long until a throttled account
+    regains access, returned here as regain_seconds.
+    Reference: https://developers.facebook.com/docs/graph-api/overview/rate-limiting/
+    """
+    usage: Dict[str, Any] = {}
+    try:
+        app = json.loads(headers.get("x-app-usage") or "{}")
+        if app:
+            usage["app"] = max(float(v) for v in app.values())
+        account = json.loads(headers.get("x-ad-account-usage") or "{}")
+        if "acc_id_util_pct" in account:
+            usage["ad_account"] = float(account["acc_id_util_pct"])
+        business = json.loads(headers.get("x-business-use-case-usage") or "{}")
+        entries = [e for items in business.values() for e in items]
+        if entries:
+            usage["business_use_case"] = max(
+                float(e.get(k, 0)) for e in entries for k in ("call_count", "total_cputime", "total_time")
+            )
+            usage["regain_seconds"] = max(float(e.get("estimated_time_to_regain_access", 0)) * 60 for e in entries)
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.debug(f"Ignoring malformed usage headers: {e}")
+    return usage
+
+
+class RetryPolicy:
+    """How failed or slow Graph reads are retried
+
+    Only GET requests are retried: writes are not idempotent, and status
+    writes already have their own retries in the outbox. Transient errors are
+    retried up to max_attempts with jittered exponential backoff; throttling
+    errors wait at least as long as Graph says access takes to come back, and
+    aren't retried at all if that is longer than max_delay.
+
+    With hedge_after set, a read that hasn't answered after that many seconds
+    is sent a second time and whichever answers first wins. Hedging is skipped
+    while usage is above usage_threshold percent, since it costs quota.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 hedge_after: Optional[float] = None, usage_threshold: float = 80.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+        self.usage_threshold = usage_threshold
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "RetryPolicy":
+        """Build from the meta_api.retry config section; missing keys keep their defaults"""
+        keys = ("max_attempts", "base_delay", "max_delay", "hedge_after", "usage_threshold")
+        return cls(**{k: v for k, v in (config or {}).items() if k in keys})
+
+    def backoff(self, attempt: int, min_delay: float = 0.0) -> float:
+        delay = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return max(min_delay, delay / 2 + random.uniform(0, delay / 2))
+
+
+def _normalize_insights(entity: Dict[str, Any]):
+    """Move Graph's nested insights list into a flat performance_metrics dict"""
+    insights_data = entity.pop("insights", None)
+    if isinstance(insights_data, dict) and "data" in insights_data:
+        insights_list = insights_data["data"]
+    elif isinstance(insights_data, list):
+        insights_list = insights_data
+    else:
+        insights_list = []
+    entity["performance_metrics"] = insights_list[0] if insights_list else {}
+
+
 class MetaAPIClient:
     """Client for interacting with Meta's Marketing API"""
     
-    def __init__(self, config_path: str = "config/meta_config.json"):
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path: str = "config/meta_config.json", config: Optional[Dict[str, Any]] = None,
+                 scheduler: Optional[Any] = None):
+        # Callers that already loaded the agent config pass it in to skip reading the file again
+        self.config = config if config is not None else self._load_config(config_path)
+        # Optional admission control shared by every call (see scheduler.CallScheduler)
+        self.scheduler = scheduler
         self.base_url = self.config["meta_api"]["base_url"]
         self.access_token = self.config["meta_api"]["access_token"]
         self.ad_account_id = self.config["meta_api"]["ad_account_id"]
         self.app_id = self.config["meta_api"]["app_id"]
         self.timeout = self.config["meta_api"]["timeout"]
+        self.retry_policy = RetryPolicy.from_config(self.config["meta_api"].get("retry"))
+        # Latest rate limit usage reported by Graph (see parse_usage_headers)
+        self.usage: Dict[str, Any] = {}
+        self.stats = {"retries": 0, "hedged": 0, "hedge_wins": 0}
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
         
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configuration from JSON file"""
@@ -30,32 +238,115 @@ class MetaAPIClient:
             logger.error(f"Failed to load config: {e}")
             raise
     
-    def _make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Make a request to Meta's API"""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
+    def _send(self, method: str, url: str, data: Optional[Dict] = None, form: Optional[Dict] = None,
+              params: Optional[Dict] = None) -> Any:
+        """Send one request to Meta's API and record the usage headers it comes back with
         
-        try:
+        Every request takes a scheduler slot at the current priority.
+        
+        Args:
+            data: JSON body
+            form: Form-encoded body, for the endpoints that require one (POST only)
+            params: Extra query parameters (POST only)
+        """
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        if form is None:
+            # requests sets the Content-Type of form data itself
+            headers["Content-Type"] = "application/json"
+        
+        with self.scheduler.slot(self.usage_percent) if self.scheduler else nullcontext():
             if method == "GET":
                 response = requests.get(url, headers=headers, timeout=self.timeout)
+            elif method == "POST" and form is not None:
+                response = requests.post(url, headers=headers, params=params, data=form, timeout=self.timeout)
             elif method == "POST":
-                response = requests.post(url, headers=headers, json=data, timeout=self.timeout)
+                response = requests.post(url, headers=headers, params=params, json=data, timeout=self.timeout)
             elif method == "PUT":
                 response = requests.put(url, headers=headers, json=data, timeout=self.timeout)
             elif method == "DELETE":
                 response = requests.delete(url, headers=headers, timeout=self.timeout)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            raise
+        
+        usage = parse_usage_headers(response.headers)
+        if usage:
+            self.usage = {**usage, "updated_at": time.time()}
+        response.raise_for_status()
+        return response.json()
+    
+    def usage_percent(self) -> float:
+        """Highest reported usage across the app, ad account and business use case limits
+        
+        Readings older than a minute are ignored: they are only refreshed by
+        new calls, and a stale high reading would otherwise hold calls back forever.
+        """
+        if time.time() - self.usage.get("updated_at", 0) > USAGE_MAX_AGE:
+            return 0.0
+        return max([v for k, v in self.usage.items() if k in ("app", "ad_account", "business_use_case")] or [0.0])
+    
+    def regain_seconds(self) -> float:
+        """Seconds until a throttled account regains access, from a reading no older than usage_percent's"""
+        if time.time() - self.usage.get("updated_at", 0) > USAGE_MAX_AGE:
+            return 0.0
+        return self.usage.get("regain_seconds", 0.0)
+    
+    def _hedged_get(self, url: str) -> Dict[str, Any]:
+        """GET that is sent a second time if the first doesn't answer within hedge_after"""
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="graph-hedge")
+        first = self._hedge_executor.submit(contextvars.copy_context().run, self._send, "GET", url)
+        try:
+            return first.result(timeout=self.retry_policy.hedge_after)
+        except FutureTimeoutError:
+            pass
+        self.stats["hedged"] += 1
+        second = self._hedge_executor.submit(contextvars.copy_context().run, self._send, "GET", url)
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        if winner.exception() is not None:
+            # Either answer will do; only fail if both requests fail
+            winner = second if winner is first else first
+        if winner is second:
+            self.stats["hedge_wins"] += 1
+        return winner.result()
+    
+    def _retry_delay(self, exc: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a failed read, or None to give up"""
+        policy = self.retry_policy
+        if attempt >= policy.max_attempts or not is_transient_error(exc):
+            return None
+        min_delay = 0.0
+        if is_throttling_error(exc):
+            min_delay = parse_usage_headers(exc.response.headers).get("regain_seconds", 0.0)
+            if min_delay > policy.max_delay:
+                return None
+        return policy.backoff(attempt, min_delay)
+    
+    def _make_request(self, endpoint: str, method: str = "GET", data: Optional[Dict] = None) -> Dict[str, Any]:
+        """Make a request to Meta's API
+        
+        Reads are retried and optionally hedged according to retry_policy;
+        other methods are sent exactly once.
+        """
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        attempt = 1
+        while True:
+            try:
+                if method != "GET":
+                    return self._send(method, url, data)
+                if self.retry_policy.hedge_after and self.usage_percent() < self.retry_policy.usage_threshold:
+                    return self._hedged_get(url)
+                return self._send(method, url)
+            except requests.exceptions.RequestException as e:
+                delay = self._retry_delay(e, attempt) if method == "GET" else None
+                if delay is None:
+                    logger.error(f"API request failed: {e}")
+                    raise
+                logger.warning(f"API request failed (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+                self.stats["retries"] += 1
+                time.sleep(delay)
+                attempt += 1
     
     def get_app_info(self) -> Dict[str, Any]:
         """Get information about the Meta app"""
@@ -72,12 +363,201 @@ class MetaAPIClient:
         response = self._make_request(f"{endpoint}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
         return response
     
-    def get_campaigns(self, limit: int = 25) -> List[Dict[str, Any]]:
-        """Get campaigns from the ad account"""
-        endpoint = f"act_{self.ad_account_id}/campaigns"
-        params = {"limit": limit, "fields": "id,name,status,objective,created_time,updated_time,daily_budget,lifetime_budget"}
-        response = self._make_request(f"{endpoint}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
-        return response.get("data", [])
+    def _next_page_path(self, response: Dict[str, Any]) -> Optional[str]:
+        """Relative path of the next page from a paged response, if there is one
+
+        Graph returns absolute 'next' URLs; they are turned back into paths so
+        every page goes through _make_request like the first one.
+        """
+        next_url = response.get("paging", {}).get("next") if isinstance(response, dict) else None
+        if not next_url:
+            return None
+        if next_url.startswith(self.base_url):
+            return next_url[len(self.base_url):].lstrip("/")
+        # Different host or version prefix: keep everything after the version segment
+        path = urlsplit(next_url)
+        return "/".join(path.path.lstrip("/").split("/")[1:]) + (f"?{path.query}" if path.query else "")
+    
+    def _iter_pages(self, path: str, prefetch: bool = False, strict: bool = True,
+                    first_page: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield raw Graph responses page by page
+        
+        Args:
+            prefetch: Request the next page in a background thread while the
+                caller processes the current one (at most one page ahead)
+            strict: Raise if a later page fails; otherwise log and stop there
+            first_page: Already-fetched first page (e.g. a nested edge), in which
+                case path is not requested
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            response = first_page if first_page is not None else self._make_request(path)
+            while True:
+                next_path = self._next_page_path(response)
+                pending = executor.submit(contextvars.copy_context().run, self._make_request, next_path) if executor and next_path else None
+                yield response
+                if not next_path:
+                    return
+                try:
+                    response = pending.result() if pending else self._make_request(next_path)
+                except Exception as e:
+                    if strict:
+                        raise
+                    logger.warning(f"Failed to fetch next page: {e}")
+                    return
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _aiter_pages(self, path: str, prefetch: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of _iter_pages; requests run in worker threads"""
+        response = await asyncio.to_thread(self._make_request, path)
+        pending = None
+        try:
+            while True:
+                next_path = self._next_page_path(response)
+                if prefetch and next_path:
+                    pending = asyncio.ensure_future(asyncio.to_thread(self._make_request, next_path))
+                yield response
+                if not next_path:
+                    return
+                response = await pending if pending else await asyncio.to_thread(self._make_request, next_path)
+                pending = None
+        finally:
+            if pending:
+                pending.cancel()
+    
+    def _campaigns_path(self, page_size: int, fields: Optional[List[str]]) -> str:
+        validate_projection(fields)
+        params = {"limit": page_size, "fields": build_fields(CAMPAIGN_FIELDS, fields, metrics=[])}
+        return f"act_{self.ad_account_id}/campaigns?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+    
+    def _ad_sets_path(self, campaign_id: str, page_size: int, fields: Optional[List[str]],
+                      metrics: Optional[List[str]], date_preset: str) -> str:
+        validate_projection(fields, metrics)
+        params = {
+            "limit": page_size, 
+            "fields": build_fields(AD_SET_FIELDS, fields, metrics=metrics or [])
+        }
+        if metrics:
+            params["date_preset"] = date_preset
+        return f"{campaign_id}/adsets?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+    
+    def _ads_path(self, ad_set_id: str, page_size: int, fields: Optional[List[str]],
+                  metrics: Optional[List[str]], date_preset: str) -> str:
+        validate_projection(fields, metrics)
+        params = {
+            "limit": page_size,
+            "fields": build_fields(AD_FIELDS, fields, metrics=metrics or [])
+        }
+        if metrics:
+            params["date_preset"] = date_preset
+        return f"{ad_set_id}/ads?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+    
+    def _insights_path(self, level: str, page_size: int, fields: Optional[List[str]], date_preset: Optional[str],
+                       since: Optional[str], until: Optional[str], time_increment: Optional[int]) -> str:
+        if level not in ("account", "campaign", "adset", "ad"):
+            raise ValueError(f"Unknown insights level: {level}")
+        params = {
+            "level": level,
+            "fields": ",".join(fields or ["campaign_id", "adset_id", "ad_id"] + INSIGHT_METRICS),
+            "limit": page_size
+        }
+        if since and until:
+            params["time_range"] = quote(json.dumps({"since": since, "until": until}, separators=(",", ":")))
+        else:
+            params["date_preset"] = date_preset or "last_30d"
+        if time_increment:
+            params["time_increment"] = time_increment
+        return f"act_{self.ad_account_id}/insights?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+    
+    @staticmethod
+    def _with_insights(entities: List[Dict[str, Any]], metrics: Optional[List[str]]) -> List[Dict[str, Any]]:
+        if metrics:
+            for entity in entities:
+                _normalize_insights(entity)
+        return entities
+    
+    def iter_campaigns(self, page_size: int = 25, fields: Optional[List[str]] = None,
+                       prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield every campaign in the ad account, one page in memory at a time"""
+        for page in self._iter_pages(self._campaigns_path(page_size, fields), prefetch=prefetch):
+            yield from page.get("data", [])
+    
+    def iter_ad_sets(self, campaign_id: str, page_size: int = 25, fields: Optional[List[str]] = None,
+                     metrics: Optional[List[str]] = None, date_preset: str = "last_30d",
+                     prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield every ad set of a campaign (see get_ad_sets for fields/metrics)"""
+        path = self._ad_sets_path(campaign_id, page_size, fields, metrics, date_preset)
+        for page in self._iter_pages(path, prefetch=prefetch):
+            yield from self._with_insights(page.get("data", []), metrics)
+    
+    def iter_ads(self, ad_set_id: str, page_size: int = 25, fields: Optional[List[str]] = None,
+                 metrics: Optional[List[str]] = None, date_preset: str = "last_30d",
+                 prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield every ad of an ad set (see get_ads for fields/metrics)"""
+        path = self._ads_path(ad_set_id, page_size, fields, metrics, date_preset)
+        for page in self._iter_pages(path, prefetch=prefetch):
+            yield from self._with_insights(page.get("data", []), metrics)
+    
+    def iter_insights(self, level: str = "campaign", date_preset: Optional[str] = None,
+                      since: Optional[str] = None, until: Optional[str] = None,
+                      time_increment: Optional[int] = None, fields: Optional[List[str]] = None,
+                      page_size: int = 500, prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield insights rows for the ad account at the given level
+        
+        Args:
+            level: 'account', 'campaign', 'adset' or 'ad'
+            date_preset: Date range preset, used unless since/until are given
+            since/until: Explicit date range (YYYY-MM-DD, inclusive)
+            time_increment: 1 for one row per entity per day
+            fields: Insights fields (default: entity ids plus INSIGHT_METRICS)
+        """
+        path = self._insights_path(level, page_size, fields, date_preset, since, until, time_increment)
+        for page in self._iter_pages(path, prefetch=prefetch):
+            yield from page.get("data", [])
+    
+    async def aiter_campaigns(self, page_size: int = 25, fields: Optional[List[str]] = None,
+                              prefetch: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of iter_campaigns"""
+        async for page in self._aiter_pages(self._campaigns_path(page_size, fields), prefetch=prefetch):
+            for campaign in page.get("data", []):
+                yield campaign
+    
+    async def aiter_ad_sets(self, campaign_id: str, page_size: int = 25, fields: Optional[List[str]] = None,
+                            metrics: Optional[List[str]] = None, date_preset: str = "last_30d",
+                            prefetch: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of iter_ad_sets"""
+        path = self._ad_sets_path(campaign_id, page_size, fields, metrics, date_preset)
+        async for page in self._aiter_pages(path, prefetch=prefetch):
+            for ad_set in self._with_insights(page.get("data", []), metrics):
+                yield ad_set
+    
+    async def aiter_ads(self, ad_set_id: str, page_size: int = 25, fields: Optional[List[str]] = None,
+                        metrics: Optional[List[str]] = None, date_preset: str = "last_30d",
+                        prefetch: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of iter_ads"""
+        path = self._ads_path(ad_set_id, page_size, fields, metrics, date_preset)
+        async for page in self._aiter_pages(path, prefetch=prefetch):
+            for ad in self._with_insights(page.get("data", []), metrics):
+                yield ad
+    
+    async def aiter_insights(self, level: str = "campaign", date_preset: Optional[str] = None,
+                             since: Optional[str] = None, until: Optional[str] = None,
+                             time_increment: Optional[int] = None, fields: Optional[List[str]] = None,
+                             page_size: int = 500, prefetch: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of iter_insights"""
+        path = self._insights_path(level, page_size, fields, date_preset, since, until, time_increment)
+        async for page in self._aiter_pages(path, prefetch=prefetch):
+            for row in page.get("data", []):
+                yield row
+    
+    def get_campaigns(self, limit: int = 25, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get all campaigns from the ad account, requested limit per page"""
+        campaigns = []
+        for page in self._iter_pages(self._campaigns_path(limit, fields), strict=False):
+            campaigns.extend(page.get("data", []))
+        return campaigns
     
     def get_insights(self, date_preset: str = "today") -> Dict[str, Any]:
         """Get insights/metrics for the ad account"""
@@ -89,41 +569,135 @@ class MetaAPIClient:
         response = self._make_request(f"{endpoint}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
         return response.get("data", [{}])[0] if response.get("data") else {}
     
-    def get_ad_sets(self, campaign_id: str, limit: int = 25) -> List[Dict[str, Any]]:
-        """Get ad sets for a specific campaign"""
-        endpoint = f"{campaign_id}/adsets"
-        params = {
-            "limit": limit, 
-            "fields": "id,name,status,effective_status,daily_budget,lifetime_budget,optimization_goal,created_time,updated_time"
-        }
-        response = self._make_request(f"{endpoint}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
-        ad_sets = response.get("data", [])
+    def get_ad_sets(self, campaign_id: str, limit: int = 25, fields: Optional[List[str]] = None,
+                    metrics: Optional[List[str]] = None, date_preset: str = "last_30d") -> List[Dict[str, Any]]:
+        """Get ad sets for a specific campaign
+
+        Insights are only requested when metrics are given; they are returned
+        as performance_metrics on each ad set. Pages after the first that fail
+        are logged and skipped.
+        """
+        ad_sets = []
+        path = self._ad_sets_path(campaign_id, limit, fields, metrics, date_preset)
+        for page in self._iter_pages(path, strict=False):
+            ad_sets.extend(self._with_insights(page.get("data", []), metrics))
+        return ad_sets
+    
+    def get_ads(self, ad_set_id: str, limit: int = 25, fields: Optional[List[str]] = None,
+                metrics: Optional[List[str]] = None, date_preset: str = "last_30d") -> List[Dict[str, Any]]:
+        """Get all ads for a specific ad set, requested limit per page
+
+        Insights are only requested when metrics are given; they are returned
+        as performance_metrics on each ad.
+        """
+        ads = []
+        path = self._ads_path(ad_set_id, limit, fields, metrics, date_preset)
+        for page in self._iter_pages(path, strict=False):
+            ads.extend(self._with_insights(page.get("data", []), metrics))
+        return ads
+    
+    def _get_object_chunk(self, ids: List[str], field_expr: str, date_preset: Optional[str],
+                          errors: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Read one chunk of ids, dropping the ids Graph reports as missing
         
-        # Handle pagination
-        while "paging" in response and "next" in response["paging"]:
-            try:
-                next_url = response["paging"]["next"]
-                if "?" in next_url:
-                    query_string = next_url.split("?")[1]
-                    response = self._make_request(f"{endpoint}?{query_string}")
-                    ad_sets.extend(response.get("data", []))
-                else:
-                    break
-            except Exception as e:
-                logger.warning(f"Failed to fetch next page of ad sets: {e}")
-                break
+        A single id that doesn't exist (or isn't readable) fails a multi-id read
+        with error #100 naming the bad ids; they are recorded in errors and the
+        rest of the chunk is read again. If the message doesn't name them, the
+        chunk is bisected until they are isolated. Any other error applies to the
+        whole request (permissions, a field the level doesn't have) and is raised.
+        """
+        params = {"ids": ",".join(ids), "fields": field_expr}
+        if date_preset:
+            params["date_preset"] = date_preset
+        try:
+            return self._make_request(f"?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
+        except requests.exceptions.HTTPError as e:
+            error = graph_error(e) or {}
+            message = error.get("message", "")
+            match = MISSING_IDS_PATTERN.search(message)
+            if error.get("code") != 100 or not match:
+                raise
+            if len(ids) == 1:
+                errors[ids[0]] = message
+                return {}
+            missing = [i for i in ids if i in {m.strip() for m in match.group(1).split(",")}]
+            if missing:
+                for object_id in missing:
+                    errors[object_id] = message
+                remaining = [i for i in ids if i not in missing]
+                return self._get_object_chunk(remaining, field_expr, date_preset, errors) if remaining else {}
+            middle = len(ids) // 2
+            return {
+                **self._get_object_chunk(ids[:middle], field_expr, date_preset, errors),
+                **self._get_object_chunk(ids[middle:], field_expr, date_preset, errors)
+            }
+    
+    def get_objects(self, ids: List[str], fields: Optional[List[str]] = None, metrics: Optional[List[str]] = None,
+                    date_preset: str = "last_30d", max_workers: int = 4) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        """Read campaigns, ad sets and ads by id with Graph's multi-id (?ids=) read
         
-        return ad_sets
+        Ids are read MAX_IDS_PER_REQUEST at a time, with up to max_workers
+        chunks in flight. Ids of different levels may be mixed.
+        
+        Args:
+            fields: Fields to return (default: OBJECT_FIELDS); a field one of the levels doesn't have fails the read
+            metrics: Insights metrics to include as performance_metrics (default: none)
+        
+        Returns:
+            (objects by id, error message by id for ids that couldn't be read)
+        
+        Reference: https://developers.facebook.com/docs/graph-api/overview#multiple-ids
+        """
+        validate_projection(fields, metrics)
+        ids = list(dict.fromkeys(i for i in ids if i))
+        field_expr = build_fields(["id"] + [f for f in fields if f != "id"] if fields else OBJECT_FIELDS, metrics=metrics or [])
+        chunks = [ids[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(ids), MAX_IDS_PER_REQUEST)]
+        errors: Dict[str, str] = {}
+        objects: Dict[str, Dict[str, Any]] = {}
+        if not chunks:
+            return objects, errors
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._get_object_chunk, chunk, field_expr, date_preset if metrics else None, errors)
+                for chunk in chunks
+            ]
+            for future in futures:
+                objects.update(future.result())
+        if metrics:
+            self._with_insights(list(objects.values()), metrics)
+        return objects, errors
     
-    def get_ads(self, ad_set_id: str, limit: int = 25) -> List[Dict[str, Any]]:
-        """Get ads for a specific ad set"""
-        endpoint = f"{ad_set_id}/ads"
-        params = {
-            "limit": limit,
-            "fields": "id,name,status,effective_status,creative,created_time,updated_time"
-        }
-        response = self._make_request(f"{endpoint}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
-        return response.get("data", [])
+    def get_daily_insights(self, level: str, since: str, until: str, limit: int = 500) -> List[Dict[str, Any]]:
+        """Get one insights row per entity per day for a date range
+
+        Args:
+            level: 'campaign', 'adset' or 'ad'
+            since: First day (YYYY-MM-DD, ad account timezone)
+            until: Last day, inclusive
+
+        Reference: https://developers.facebook.com/docs/marketing-api/insights/parameters/ (time_increment)
+        """
+        if level not in ("campaign", "adset", "ad"):
+            raise ValueError(f"Unknown insights level: {level}")
+        return list(self.iter_insights(
+            level,
+            since=since,
+            until=until,
+            time_increment=1,
+            fields=["campaign_id", "adset_id", "ad_id", "spend", "impressions", "clicks", "reach", "actions"],
+            page_size=limit
+        ))
+    
+    def _collect_edge(self, edge: Any) -> List[Dict[str, Any]]:
+        """All items of a nested edge ({'data': [...], 'paging': {...}}), following its pages"""
+        if isinstance(edge, list):
+            return edge
+        if not isinstance(edge, dict) or "data" not in edge:
+            return []
+        items = []
+        for page in self._iter_pages("", strict=False, first_page=edge):
+            items.extend(page.get("data", []))
+        return items
     
     def create_campaign(self, name: str, objective: str, status: str = "PAUSED") -> Dict[str, Any]:
         """Create a new campaign"""
@@ -135,156 +709,138 @@ class MetaAPIClient:
         }
         return self._make_request(endpoint, method="POST", data=data)
     
-    def get_campaigns_detailed(self, limit: int = 25, date_preset: str = "last_30d") -> List[Dict[str, Any]]:
-        """Get campaigns with detailed ad sets and ads using nested field requests
-        
-        Uses Meta API's nested field syntax to fetch campaigns, ad sets, and ads
-        in a single API call to avoid rate limits.
-        Includes insights (spend, impressions, clicks, etc.) using nested insights fields.
-        
-        Reference: 
-        - https://stackoverflow.com/questions/68576154/facebook-developer-apis-trying-to-fetch-all-the-campaigns-adsets-and-ads
-        - https://stackoverflow.com/questions/60916171/how-can-i-get-the-amount-spent-faceook-marketing-api
-        - https://developers.facebook.com/docs/marketing-api/reference/ads-insights/
-        """
-        endpoint = f"act_{self.ad_account_id}/campaigns"
+    def _normalize_detailed(self, campaigns: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Flatten nested edges and insights of a nested campaigns response in place"""
+        # Normalize the structure - Meta API returns nested data in 'data' field
+        for campaign in campaigns:
+            # Normalize insights - Meta API returns insights as a list with one object
+            _normalize_insights(campaign)
+            
+            # Ensure ad_sets is a list
+            # Meta API returns nested fields as objects with 'data' and 'paging' keys;
+            # nested edges are paged too, so follow them instead of keeping only the first page
+            campaign["ad_sets"] = self._collect_edge(campaign.pop("adsets", None))
+            
+            # Normalize ads and insights within each ad set
+            for ad_set in campaign.get("ad_sets", []):
+                # Normalize ad set insights
+                _normalize_insights(ad_set)
+                
+                # Normalize ads
+                ad_set["ads"] = self._collect_edge(ad_set.get("ads"))
+                
+                # Normalize insights for each ad
+                for ad in ad_set.get("ads", []):
+                    _normalize_insights(ad)
+        return campaigns
+    
+    def _detailed_path(self, limit: int, date_preset: str, levels: Optional[List[str]], fields: Optional[List[str]],
+                       metrics: Optional[List[str]], filtering: Optional[List[Dict[str, Any]]] = None,
+                       after: Optional[str] = None) -> str:
+        validate_projection(fields, metrics, levels)
+        validate_date_preset(date_preset)
+        include_ad_sets = levels is None or "adsets" in levels or "ads" in levels
+        include_ads = levels is None or "ads" in levels
         
         # Use nested fields to get campaigns with their ad sets and ads in a single call
         # Include insights with spend, impressions, clicks, etc. for accurate spend data
         # This avoids rate limits from making multiple separate API calls
         # Reference: https://stackoverflow.com/questions/60916171/how-can-i-get-the-amount-spent-faceook-marketing-api
         # The insights{spend} syntax gets actual spend from Insights API, not calculated from budget
-        fields = (
-            "id,name,status,objective,created_time,updated_time,daily_budget,lifetime_budget,"
-            "insights{spend,impressions,clicks,ctr,cpc,cpm,reach,frequency,actions,cost_per_action},"
-            "adsets{id,name,status,effective_status,daily_budget,lifetime_budget,optimization_goal,created_time,updated_time,"
-            "insights{spend,impressions,clicks,ctr,cpc,cpm,reach,frequency,actions,cost_per_action},"
-            "ads{id,name,status,effective_status,creative,created_time,updated_time,"
-            "insights{spend,impressions,clicks,ctr,cpc,cpm,reach,frequency,actions,cost_per_action}}"
-        )
+        ads_expr = f"ads{{{build_fields(AD_FIELDS, fields, metrics)}}}" if include_ads else None
+        ad_sets_expr = f"adsets{{{build_fields(AD_SET_FIELDS, fields, metrics, ads_expr)}}}" if include_ad_sets else None
+        field_expr = build_fields(CAMPAIGN_FIELDS, fields, metrics, ad_sets_expr)
         
         params = {
             "limit": limit,
-            "fields": fields,
+            "fields": field_expr,
             "date_preset": date_preset  # Pass date_preset as a query parameter for insights
         }
+        if filtering:
+            # Reference: https://developers.facebook.com/docs/marketing-api/reference/ad-account/campaigns/ (filtering)
+            params["filtering"] = quote(json.dumps(filtering, separators=(",", ":")))
+        if after:
+            params["after"] = quote(after)
+        return f"act_{self.ad_account_id}/campaigns?{'&'.join([f'{k}={v}' for k, v in params.items()])}"
+    
+    def get_campaigns_detailed_page(self, limit: int = 25, after: Optional[str] = None, date_preset: str = "last_30d",
+                                    levels: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                                    metrics: Optional[List[str]] = None,
+                                    filtering: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of get_campaigns_detailed
+        
+        Returns:
+            (campaigns, Graph 'after' cursor of the next page or None on the last page)
+        """
+        response = self._make_request(self._detailed_path(limit, date_preset, levels, fields, metrics, filtering, after))
+        next_after = response.get("paging", {}).get("cursors", {}).get("after") if self._next_page_path(response) else None
+        return self._normalize_detailed(response.get("data", [])), next_after
+    
+    def get_campaigns_detailed(self, limit: int = 25, date_preset: str = "last_30d",
+                               levels: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                               metrics: Optional[List[str]] = None,
+                               filtering: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Get campaigns with detailed ad sets and ads using nested field requests
+        
+        Uses Meta API's nested field syntax to fetch campaigns, ad sets, and ads
+        in a single API call to avoid rate limits.
+        Includes insights (spend, impressions, clicks, etc.) using nested insights fields.
+        
+        The request can be projected down to what the caller needs:
+        - levels: which levels to fetch, e.g. ['campaigns', 'adsets'] skips ads
+        - fields: entity fields to keep at every level ('id' is always kept)
+        - metrics: insights metrics to request; [] skips insights entirely
+        Skipped levels come back as empty lists and skipped insights as empty
+        performance_metrics, so the response shape stays the same.
+        
+        filtering is passed to Graph as-is to select campaigns. It is not
+        applied on the fallback path, so callers should filter the result too.
+        
+        Reference: 
+        - https://stackoverflow.com/questions/68576154/facebook-developer-apis-trying-to-fetch-all-the-campaigns-adsets-and-ads
+        - https://stackoverflow.com/questions/60916171/how-can-i-get-the-amount-spent-faceook-marketing-api
+        - https://developers.facebook.com/docs/marketing-api/reference/ads-insights/
+        """
+        path = self._detailed_path(limit, date_preset, levels, fields, metrics, filtering)
+        include_ad_sets = levels is None or "adsets" in levels or "ads" in levels
+        include_ads = levels is None or "ads" in levels
         
         try:
-            response = self._make_request(f"{endpoint}?{'&'.join([f'{k}={v}' for k, v in params.items()])}")
-            campaigns = response.get("data", [])
-            
+            campaigns = []
             # Handle pagination if needed
-            while "paging" in response and "next" in response["paging"]:
-                try:
-                    next_url = response["paging"]["next"]
-                    # Extract the query string from the full URL
-                    if "?" in next_url:
-                        query_string = next_url.split("?")[1]
-                        response = self._make_request(f"{endpoint}?{query_string}")
-                        campaigns.extend(response.get("data", []))
-                    else:
-                        break
-                except Exception as e:
-                    logger.warning(f"Failed to fetch next page: {e}")
-                    break
-            
-            # Normalize the structure - Meta API returns nested data in 'data' field
-            for campaign in campaigns:
-                # Normalize insights - Meta API returns insights as a list with one object
-                if "insights" in campaign:
-                    insights_data = campaign["insights"]
-                    if isinstance(insights_data, dict) and "data" in insights_data:
-                        insights_list = insights_data["data"]
-                    elif isinstance(insights_data, list):
-                        insights_list = insights_data
-                    else:
-                        insights_list = []
-                    
-                    # Extract the first insights object (or empty dict if none)
-                    campaign["performance_metrics"] = insights_list[0] if insights_list else {}
-                    del campaign["insights"]
-                else:
-                    campaign["performance_metrics"] = {}
-                
-                # Ensure ad_sets is a list
-                # Meta API returns nested fields as objects with 'data' and 'paging' keys
-                if "adsets" in campaign:
-                    if isinstance(campaign["adsets"], dict) and "data" in campaign["adsets"]:
-                        campaign["ad_sets"] = campaign["adsets"]["data"]
-                    elif isinstance(campaign["adsets"], list):
-                        # Sometimes it might already be a list
-                        campaign["ad_sets"] = campaign["adsets"]
-                    else:
-                        campaign["ad_sets"] = []
-                    # Remove the original 'adsets' key if it exists
-                    if "adsets" in campaign:
-                        del campaign["adsets"]
-                else:
-                    campaign["ad_sets"] = []
-                
-                # Normalize ads and insights within each ad set
-                for ad_set in campaign.get("ad_sets", []):
-                    # Normalize ad set insights
-                    if "insights" in ad_set:
-                        insights_data = ad_set["insights"]
-                        if isinstance(insights_data, dict) and "data" in insights_data:
-                            insights_list = insights_data["data"]
-                        elif isinstance(insights_data, list):
-                            insights_list = insights_data
-                        else:
-                            insights_list = []
-                        
-                        ad_set["performance_metrics"] = insights_list[0] if insights_list else {}
-                        del ad_set["insights"]
-                    else:
-                        ad_set["performance_metrics"] = {}
-                    
-                    # Normalize ads
-                    if "ads" in ad_set:
-                        if isinstance(ad_set["ads"], dict) and "data" in ad_set["ads"]:
-                            ad_set["ads"] = ad_set["ads"]["data"]
-                        elif isinstance(ad_set["ads"], list):
-                            # Sometimes it might already be a list
-                            pass  # Already a list, no need to change
-                        else:
-                            ad_set["ads"] = []
-                    else:
-                        ad_set["ads"] = []
-                    
-                    # Normalize insights for each ad
-                    for ad in ad_set.get("ads", []):
-                        if "insights" in ad:
-                            insights_data = ad["insights"]
-                            if isinstance(insights_data, dict) and "data" in insights_data:
-                                insights_list = insights_data["data"]
-                            elif isinstance(insights_data, list):
-                                insights_list = insights_data
-                            else:
-                                insights_list = []
-                            
-                            ad["performance_metrics"] = insights_list[0] if insights_list else {}
-                            del ad["insights"]
-                        else:
-                            ad["performance_metrics"] = {}
+            for response in self._iter_pages(path, strict=False):
+                campaigns.extend(response.get("data", []))
+            self._normalize_detailed(campaigns)
             
             return campaigns
             
         except Exception as e:
             logger.error(f"Failed to get detailed campaigns: {e}")
+            # Transient errors were already retried. Separate calls can't help a throttled
+            # account or a bad token and would only cost more requests, so those are raised.
+            code = (graph_error(e) or {}).get("code")
+            if code in THROTTLING_ERROR_CODES or code in AUTH_ERROR_CODES:
+                raise
             # Fallback to the old method if nested fields fail
             logger.warning("Falling back to separate API calls method")
-            campaigns = self.get_campaigns(limit)
+            campaigns = self.get_campaigns(limit, fields=fields)
             
             for campaign in campaigns:
+                if not include_ad_sets:
+                    campaign["ad_sets"] = []
+                    continue
                 try:
                     # Get ad sets for this campaign
-                    ad_sets = self.get_ad_sets(campaign["id"], limit=50)
+                    ad_sets = self.get_ad_sets(campaign["id"], limit=50, fields=fields)
                     campaign["ad_sets"] = ad_sets
                     
                     # Get ads for each ad set
                     for ad_set in ad_sets:
+                        if not include_ads:
+                            ad_set["ads"] = []
+                            continue
                         try:
-                            ads = self.get_ads(ad_set["id"], limit=50)
+                            ads = self.get_ads(ad_set["id"], limit=50, fields=fields)
                             ad_set["ads"] = ads
                         except Exception as e:
                             logger.warning(f"Failed to get ads for ad set {ad_set.get('id')}: {e}")
@@ -316,16 +872,10 @@ class MetaAPIClient:
             params = {
                 "access_token": self.access_token
             }
-            headers = {
-                "Authorization": f"Bearer {self.access_token}"
-                # Don't set Content-Type, let requests set it for form data
-            }
             
-            # Use POST with form data (data parameter) instead of PUT with JSON
+            # Use POST with form data instead of PUT with JSON
             # Include access_token in query params as per Meta API documentation examples
-            response = requests.post(url, headers=headers, params=params, data=data, timeout=self.timeout)
-            response.raise_for_status()
-            return response.json()
+            return self._send("POST", url, form=data, params=params)
             
         except requests.exceptions.HTTPError as e:
             # If Meta API returns an error, log it and re-raise
@@ -345,6 +895,48 @@ class MetaAPIClient:
             logger.error(f"API request failed: {e}")
             raise
 
+    def batch_update_ad_set_status(self, updates: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Update the status of several ad sets in one Graph batch request
+
+        Args:
+            updates: (ad_set_id, status) pairs, at most 50 (Graph's batch limit)
+
+        Returns:
+            One result per update, in order: {"success", "code", "body", "error"}.
+            Operations Graph didn't get to (null entries) are reported as transient
+            failures so they can be retried.
+
+        Reference: https://developers.facebook.com/docs/graph-api/batch-requests/
+        """
+        if len(updates) > 50:
+            raise ValueError("Graph batch requests are limited to 50 operations")
+        batch = [
+            {"method": "POST", "relative_url": ad_set_id, "body": urlencode({"status": status})}
+            for ad_set_id, status in updates
+        ]
+        response = self._send(
+            "POST",
+            f"{self.base_url}/",
+            form={"access_token": self.access_token, "batch": json.dumps(batch), "include_headers": "false"}
+        )
+
+        results = []
+        for item in response:
+            if item is None:
+                results.append({
+                    "success": False, "code": None, "body": None,
+                    "error": {"message": "Operation not processed by batch", "is_transient": True}
+                })
+                continue
+            try:
+                body = json.loads(item.get("body") or "{}")
+            except ValueError:
+                body = {"raw": item.get("body")}
+            code = item.get("code")
+            success = code == 200 and "error" not in body
+            results.append({"success": success, "code": code, "body": body, "error": None if success else body.get("error", {})})
+        return results
+
     def test_connection(self) -> bool:
         """Test the connection to Meta's API"""
         try:
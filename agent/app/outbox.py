@@ -0,0 +1,147 @@
+import time
+import random
+import sqlite3
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS status_outbox (
+    adset_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    state TEXT NOT NULL DEFAULT 'pending'
+)
+"""
+
+
+class StatusOutbox:
+    """Durable, coalescing queue of ad set status writes
+
+    Writes are stored in SQLite before they are acknowledged, so they survive
+    agent restarts. There is at most one row per ad set: a newer write replaces
+    a pending one (last writer wins) and a sequence number makes sure a write
+    that was superseded while in flight doesn't delete its replacement.
+
+    Failed writes are retried with jittered exponential backoff until
+    max_attempts, after which they are kept with state 'failed' for inspection.
+    A pending write overtaken by a direct write to Meta is kept with state
+    'superseded' (see cancel).
+
+    Several worker processes may enqueue into the same database; only one of
+    them should drain it.
+    """
+
+    def __init__(self, path: Path, base_delay: float = 2.0, max_delay: float = 300.0, max_attempts: int = 8):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(SCHEMA)
+
+    def enqueue(self, adset_id: str, status: str) -> Dict[str, Any]:
+        """Record a status write, replacing any pending write for the same ad set"""
+        now = time.time()
+        with self._lock:
+            # Take the write lock up front so concurrent workers can't hand out the same seq
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT seq FROM status_outbox WHERE adset_id = ?", (adset_id,)).fetchone()
+                seq = row["seq"] + 1 if row else 1
+                self._conn.execute(
+                    """
+                    INSERT INTO status_outbox (adset_id, status, seq, enqueued_at, attempts, next_attempt_at, last_error, state)
+                    VALUES (?, ?, ?, ?, 0, ?, NULL, 'pending')
+                    ON CONFLICT(adset_id) DO UPDATE SET
+                        status = excluded.status, seq = excluded.seq, enqueued_at = excluded.enqueued_at,
+                        attempts = 0, next_attempt_at = excluded.next_attempt_at, last_error = NULL, state = 'pending'
+                    """,
+                    (adset_id, status, seq, now, now)
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return {"adset_id": adset_id, "status": status, "seq": seq, "coalesced": row is not None}
+
+    def due(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Pending writes whose backoff has elapsed, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM status_outbox WHERE state = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY enqueued_at LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_done(self, adset_id: str, seq: int):
+        """Remove a delivered write unless it was superseded meanwhile"""
+        with self._lock:
+            self._conn.execute("DELETE FROM status_outbox WHERE adset_id = ? AND seq = ?", (adset_id, seq))
+
+    def mark_failed(self, adset_id: str, seq: int, error: str, retryable: bool = True):
+        """Schedule a retry with jittered backoff, or give up on the write"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM status_outbox WHERE adset_id = ? AND seq = ?", (adset_id, seq)
+            ).fetchone()
+            if row is None:
+                return
+            attempts = row["attempts"] + 1
+            if not retryable or attempts >= self.max_attempts:
+                self._conn.execute(
+                    "UPDATE status_outbox SET attempts = ?, last_error = ?, state = 'failed' WHERE adset_id = ? AND seq = ?",
+                    (attempts, error, adset_id, seq)
+                )
+                logger.error(f"Giving up on status write for ad set {adset_id} after {attempts} attempts: {error}")
+                return
+            delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            self._conn.execute(
+                "UPDATE status_outbox SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE adset_id = ? AND seq = ?",
+                (attempts, error, time.time() + delay, adset_id, seq)
+            )
+
+    def cancel(self, adset_id: str) -> bool:
+        """Supersede a pending write, e.g. because a newer one is sent to Meta directly
+
+        The row is kept with state 'superseded' and a bumped seq rather than
+        deleted, so the seq of a later enqueue keeps increasing and a delivery
+        of the old write that is already in flight can't mark it done.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE status_outbox SET seq = seq + 1, state = 'superseded' WHERE adset_id = ? AND state = 'pending'",
+                (adset_id,)
+            )
+        return cursor.rowcount > 0
+
+    def delay_all(self, seconds: float):
+        """Push back every pending write, e.g. when Meta reports throttling"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE status_outbox SET next_attempt_at = MAX(next_attempt_at, ?) WHERE state = 'pending'",
+                (time.time() + seconds,)
+            )
+
+    def get(self, adset_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM status_outbox WHERE adset_id = ?", (adset_id,)).fetchone()
+        return dict(row) if row else None
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM status_outbox ORDER BY enqueued_at").fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,143 @@
+import sys
+import math
+import time
+import threading
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Frames from these files mark a thread as doing agent work (endpoint handlers,
+# Graph calls, background loops). Idle worker threads are skipped.
+APP_DIR = str(Path(__file__).parent)
+
+# Hard limits so a debug request can never turn into a production incident
+MIN_INTERVAL_MS = 5
+MAX_DURATION_SECONDS = 60
+MAX_STACK_DEPTH = 128
+MAX_UNIQUE_STACKS = 20000
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+class StackSampler:
+    """Sampling profiler for the running agent process
+
+    A background thread periodically captures the stacks of all threads via
+    sys._current_frames() and aggregates them into folded stacks. Output can be
+    rendered in the collapsed format understood by flamegraph.pl and speedscope,
+    or as a JSON summary of the hottest functions.
+
+    Overhead is bounded by the sampling interval (never below MIN_INTERVAL_MS),
+    the maximum stack depth and the number of distinct stacks kept.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, interval_ms: float = 10, app_only: bool = True):
+        interval_ms = float(interval_ms)
+        # max() passes NaN through, which would turn the sampling loop into a busy loop
+        if not math.isfinite(interval_ms):
+            raise ValueError(f"Sampling interval must be a finite number of milliseconds, got {interval_ms}")
+        self.interval = max(interval_ms, MIN_INTERVAL_MS) / 1000.0
+        self.app_only = app_only
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.dropped = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling; only one sampler may run at a time per process"""
+        if not StackSampler._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and release the process-wide profiler slot"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.stopped_at = time.time()
+        StackSampler._lock.release()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_ident:
+                    continue
+                stack = self._fold(frame)
+                if stack is None:
+                    continue
+                if stack not in self.stacks and len(self.stacks) >= MAX_UNIQUE_STACKS:
+                    self.dropped += 1
+                    continue
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def _fold(self, frame) -> Optional[str]:
+        """Turn a frame into a root-first, semicolon separated stack"""
+        names = []
+        in_app = False
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            if code.co_filename.startswith(APP_DIR):
+                in_app = True
+            names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+            frame = frame.f_back
+        if self.app_only and not in_app:
+            return None
+        return ";".join(reversed(names))
+
+    def collapsed(self) -> str:
+        """Render samples in the collapsed (folded) flame graph format"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, top: int = 50) -> Dict[str, Any]:
+        """Summarize samples as self/total counts per function"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = [f.rsplit(":", 1)[0] + ")" for f in stack.split(";")]
+            self_counts[frames[-1]] += count
+            for name in set(frames):
+                total_counts[name] += count
+
+        def _rows(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {
+                    "function": name,
+                    "samples": count,
+                    "percent": round(100.0 * count / self.samples, 2) if self.samples else 0.0
+                }
+                for name, count in counter.most_common(top)
+            ]
+
+        duration = (self.stopped_at or time.time()) - (self.started_at or time.time())
+        return {
+            "duration_seconds": round(duration, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "unique_stacks": len(self.stacks),
+            "dropped_samples": self.dropped,
+            "top_self": _rows(self_counts),
+            "top_total": _rows(total_counts)
+        }
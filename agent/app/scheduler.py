@@ -0,0 +1,136 @@
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, Iterator, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first
+PRIORITIES = ["interactive", "rule", "sync"]
+
+# Priority of the Graph calls made in the current request or task (see CallScheduler.priority)
+current_priority: ContextVar[str] = ContextVar("meta_call_priority", default="interactive")
+
+
+def parse_priority(value: Optional[str], default: str = "interactive") -> str:
+    return value if value in PRIORITIES else default
+
+
+class CallScheduler:
+    """Admission control for Graph calls by priority class
+
+    Every call takes one of max_concurrency slots. A class may only start a
+    call while it is below its own concurrency limit and enough slots stay
+    free for the reservations of the classes above it, so background work
+    can never occupy the slots interactive requests need. Waiting calls are
+    admitted highest class first, and in arrival order within a class.
+
+    The rate budget is reserved the same way: a class waits while the usage
+    Graph reports is above its usage ceiling, leaving the remaining quota to
+    the classes above it.
+    """
+
+    def __init__(self, max_concurrency: int = 6, limits: Optional[Dict[str, int]] = None,
+                 reserved: Optional[Dict[str, int]] = None, usage_ceilings: Optional[Dict[str, float]] = None):
+        self.max_concurrency = max_concurrency
+        self.limits = {"interactive": max_concurrency, "rule": 3, "sync": 2, **(limits or {})}
+        self.reserved = {"interactive": 2, "rule": 1, "sync": 0, **(reserved or {})}
+        self.usage_ceilings = {"interactive": 100.0, "rule": 90.0, "sync": 75.0, **(usage_ceilings or {})}
+        self._cond = threading.Condition()
+        self._in_flight = {p: 0 for p in PRIORITIES}
+        self._queues: Dict[str, Deque[int]] = {p: deque() for p in PRIORITIES}
+        self._tickets = 0
+        self._completed = {p: 0 for p in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=500) for p in PRIORITIES}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "CallScheduler":
+        """Build from the agent.scheduler config section; missing keys keep their defaults"""
+        keys = ("max_concurrency", "limits", "reserved", "usage_ceilings")
+        return cls(**{k: v for k, v in (config or {}).items() if k in keys})
+
+    @contextmanager
+    def priority(self, priority: str) -> Iterator[None]:
+        """Run the Graph calls made inside the block at the given priority"""
+        token = current_priority.set(parse_priority(priority))
+        try:
+            yield
+        finally:
+            current_priority.reset(token)
+
+    def _free_for(self, priority: str) -> int:
+        """Slots a call of this class may still take"""
+        higher = PRIORITIES[:PRIORITIES.index(priority)]
+        held_back = sum(max(0, self.reserved.get(p, 0) - self._in_flight[p]) for p in higher)
+        return self.max_concurrency - sum(self._in_flight.values()) - held_back
+
+    def _can_start(self, priority: str, usage: float) -> bool:
+        return (
+            self._in_flight[priority] < self.limits.get(priority, self.max_concurrency)
+            and self._free_for(priority) > 0
+            and usage < self.usage_ceilings.get(priority, 100.0)
+        )
+
+    @contextmanager
+    def slot(self, usage: Callable[[], float] = lambda: 0.0) -> Iterator[None]:
+        """Hold a slot for one Graph call at the current priority
+
+        Args:
+            usage: Current rate limit usage in percent, re-read while waiting
+        """
+        priority = current_priority.get()
+        started = time.monotonic()
+        with self._cond:
+            self._tickets += 1
+            ticket = self._tickets
+            queue = self._queues[priority]
+            queue.append(ticket)
+            try:
+                while True:
+                    over_budget = usage() >= self.usage_ceilings.get(priority, 100.0)
+                    higher_waiting = any(
+                        self._queues[p] and self._can_start(p, 0.0)
+                        for p in PRIORITIES[:PRIORITIES.index(priority)]
+                    )
+                    if queue[0] == ticket and not higher_waiting and self._can_start(priority, usage()):
+                        break
+                    # Usage only changes when other calls complete, so poll while over budget
+                    self._cond.wait(timeout=1.0 if over_budget else None)
+            finally:
+                queue.remove(ticket)
+            self._in_flight[priority] += 1
+            waited = time.monotonic() - started
+            self._waits[priority].append(waited)
+            # The next waiter of this class may be admissible too
+            self._cond.notify_all()
+        if waited > 1.0:
+            logger.info(f"{priority} Graph call waited {waited:.2f}s for a slot")
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight[priority] -= 1
+                self._completed[priority] += 1
+                self._cond.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        """Queue depth, calls in flight and recent wait times per class"""
+        with self._cond:
+            result = {}
+            for p in PRIORITIES:
+                waits = sorted(self._waits[p])
+                result[p] = {
+                    "queued": len(self._queues[p]),
+                    "in_flight": self._in_flight[p],
+                    "completed": self._completed[p],
+                    "limit": self.limits.get(p),
+                    "reserved": self.reserved.get(p, 0),
+                    "usage_ceiling": self.usage_ceilings.get(p),
+                    "wait_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                    "wait_ms_p95": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else None,
+                    "wait_ms_max": round(waits[-1] * 1000, 1) if waits else None
+                }
+            return {"max_concurrency": self.max_concurrency, "classes": result}
@@ -0,0 +1,124 @@
+import time
+import secrets
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Levels as the hierarchical endpoints name them, and the per-campaign count each one feeds
+LEVEL_COUNT_KEYS = {"adsets": "ad_sets", "ads": "ads"}
+
+
+class SummaryIndex:
+    """Account counts kept up to date as the tree changes, so they can be read without walking it
+
+    Holds the number of campaigns, ad sets and ads per status, and per
+    campaign its ad set and ad counts plus spend and impressions for one
+    date preset. A sync replaces the index with a full tree (only entities
+    that changed touch the counters); a status write adjusts one entity.
+
+    Each worker keeps its own index, fed by the hierarchy views it loads and
+    the status writes it accepts; the next sync corrects any drift.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # entity id -> (level, status, campaign id)
+        self._entities: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self._counts: Dict[str, Counter] = {level: Counter() for level in ("campaigns", "adsets", "ads")}
+        self._campaigns: Dict[str, Dict[str, Any]] = {}
+        self._totals = {"spend": 0.0, "impressions": 0}
+        self.date_preset: Optional[str] = None
+        self.synced_at: Optional[float] = None
+        self.version = 0
+        # Versions restart at 0 with every index, and a restarted container usually
+        # gets the same pid, so ETags are scoped to this instance with a random token
+        self._instance = secrets.token_hex(6)
+
+    def _put(self, level: str, entity_id: str, status: str, campaign_id: Optional[str]) -> bool:
+        entry = (level, status, campaign_id)
+        if self._entities.get(entity_id) == entry:
+            return False
+        if entity_id in self._entities:
+            self._remove(entity_id)
+        self._entities[entity_id] = entry
+        self._counts[level][status] += 1
+        if level in LEVEL_COUNT_KEYS and campaign_id in self._campaigns:
+            self._campaigns[campaign_id][LEVEL_COUNT_KEYS[level]] += 1
+        return True
+
+    def _remove(self, entity_id: str):
+        level, status, campaign_id = self._entities.pop(entity_id)
+        self._counts[level][status] -= 1
+        if not self._counts[level][status]:
+            del self._counts[level][status]
+        if level in LEVEL_COUNT_KEYS and campaign_id in self._campaigns:
+            self._campaigns[campaign_id][LEVEL_COUNT_KEYS[level]] -= 1
+
+    def sync(self, campaigns: List[Dict[str, Any]], date_preset: str):
+        """Bring the index in line with a full campaign -> ad set -> ad tree"""
+        with self._lock:
+            seen = set()
+            for campaign in campaigns:
+                campaign_id = campaign["id"]
+                seen.add(campaign_id)
+                metrics = campaign.get("performance_metrics") or {}
+                record = self._campaigns.setdefault(campaign_id, {"ad_sets": 0, "ads": 0})
+                record.update(
+                    name=campaign.get("name"),
+                    status=campaign.get("status"),
+                    spend=float(metrics.get("spend", 0) or 0),
+                    impressions=int(metrics.get("impressions", 0) or 0)
+                )
+                self._put("campaigns", campaign_id, campaign.get("status") or "UNKNOWN", None)
+                for ad_set in campaign.get("ad_sets", []):
+                    seen.add(ad_set["id"])
+                    self._put("adsets", ad_set["id"], ad_set.get("status") or "UNKNOWN", campaign_id)
+                    for ad in ad_set.get("ads", []):
+                        seen.add(ad["id"])
+                        self._put("ads", ad["id"], ad.get("status") or "UNKNOWN", campaign_id)
+
+            for entity_id in [e for e in self._entities if e not in seen]:
+                self._remove(entity_id)
+            for campaign_id in [c for c in self._campaigns if c not in seen]:
+                del self._campaigns[campaign_id]
+
+            self._totals = {
+                "spend": round(sum(c["spend"] for c in self._campaigns.values()), 2),
+                "impressions": sum(c["impressions"] for c in self._campaigns.values())
+            }
+            self.date_preset = date_preset
+            self.synced_at = time.time()
+            self.version += 1
+
+    def set_status(self, entity_id: str, status: str) -> bool:
+        """Record a status write; entities the index hasn't seen yet are left to the next sync"""
+        with self._lock:
+            entry = self._entities.get(entity_id)
+            if entry is None:
+                return False
+            level, _, campaign_id = entry
+            if not self._put(level, entity_id, status, campaign_id):
+                return False
+            if level == "campaigns":
+                self._campaigns[entity_id]["status"] = status
+            self.version += 1
+            return True
+
+    def etag(self, variant: str = "") -> str:
+        """ETag of the current index state, without serializing it"""
+        return f'W/"summary-{self._instance}-{self.version}{variant}"'
+
+    def snapshot(self, include_campaigns: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            result = {
+                "date_preset": self.date_preset,
+                "synced_at": self.synced_at,
+                "counts": {
+                    level: {"total": sum(counts.values()), "by_status": dict(counts)}
+                    for level, counts in self._counts.items()
+                },
+                "totals": dict(self._totals)
+            }
+            if include_campaigns:
+                result["campaigns"] = {campaign_id: dict(record) for campaign_id, record in self._campaigns.items()}
+            return result
@@ -0,0 +1,293 @@
+import time
+import sqlite3
+import threading
+import logging
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Insights levels as Graph names them, and the id column each one is keyed by
+LEVEL_ID_FIELDS = {"campaign": "campaign_id", "adset": "adset_id", "ad": "ad_id"}
+SERIES_METRICS = ["spend", "impressions", "clicks", "reach", "conversions"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_insights (
+    level TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    campaign_id TEXT,
+    adset_id TEXT,
+    spend REAL NOT NULL DEFAULT 0,
+    impressions INTEGER NOT NULL DEFAULT 0,
+    clicks INTEGER NOT NULL DEFAULT 0,
+    reach INTEGER NOT NULL DEFAULT 0,
+    conversions REAL NOT NULL DEFAULT 0,
+    final INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (level, entity_id, date)
+)
+"""
+
+# Position of the last daily row pushed to the CRM (see TimeSeriesStore.changed_rows)
+PUSH_CURSOR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_push_cursor (
+    name TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    level TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    date TEXT NOT NULL
+)
+"""
+
+# Ad account facts the ingestion learned (timezone, currency) and when it last ran,
+# kept here so every worker serving the history reads the same values
+INGEST_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+)
+"""
+
+# Currencies Meta reports without minor units (no cents)
+# Reference: https://developers.facebook.com/docs/marketing-api/currencies/
+ZERO_DECIMAL_CURRENCIES = {"CLP", "COP", "CRC", "HUF", "ISK", "IDR", "JPY", "KRW", "PYG", "TWD", "VND"}
+
+
+def to_minor_units(amount: float, currency: Optional[str]) -> int:
+    """Convert a spend amount in the account currency to integer minor units (e.g. cents)"""
+    if currency and currency.upper() in ZERO_DECIMAL_CURRENCIES:
+        return int(round(amount))
+    return int(round(amount * 100))
+
+
+def count_conversions(actions: Optional[List[Dict[str, Any]]]) -> float:
+    """Conversions from an insights actions list, counted like the backend does
+
+    omni_purchase already includes purchase, so purchase only counts when
+    omni_purchase is absent.
+    """
+    values = {a.get("action_type"): float(a.get("value", 0)) for a in actions or []}
+    purchases = values.get("omni_purchase", values.get("purchase", 0.0))
+    return purchases + values.get("lead", 0.0)
+
+
+class TimeSeriesStore:
+    """Local SQLite store of daily insights rows per campaign, ad set and ad
+
+    Meta keeps revising the most recent days (delayed attribution), so rows
+    are only marked final once they are older than the refresh window. Final
+    days are never fetched again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(SCHEMA)
+        self._conn.execute(PUSH_CURSOR_SCHEMA)
+        self._conn.execute(INGEST_STATE_SCHEMA)
+
+    def last_final_date(self, level: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(date) AS date FROM daily_insights WHERE level = ? AND final = 1", (level,)
+            ).fetchone()
+        return row["date"]
+
+    def upsert(self, level: str, rows: List[Dict[str, Any]], first_open_day: str) -> int:
+        """Store Graph insights rows; days before first_open_day are marked final"""
+        id_field = LEVEL_ID_FIELDS[level]
+        now = time.time()
+        values = [
+            (
+                level,
+                row[id_field],
+                row["date_start"],
+                row.get("campaign_id"),
+                row.get("adset_id"),
+                float(row.get("spend", 0) or 0),
+                int(row.get("impressions", 0) or 0),
+                int(row.get("clicks", 0) or 0),
+                int(row.get("reach", 0) or 0),
+                count_conversions(row.get("actions")),
+                1 if row["date_start"] < first_open_day else 0,
+                now
+            )
+            for row in rows
+            if row.get(id_field) and row.get("date_start")
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO daily_insights "
+                    "(level, entity_id, date, campaign_id, adset_id, spend, impressions, clicks, reach, conversions, final, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    values
+                )
+                # Days without delivery have no row; once the window has passed them they are final too
+                self._conn.execute(
+                    "UPDATE daily_insights SET final = 1 WHERE level = ? AND date < ? AND final = 0",
+                    (level, first_open_day)
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(values)
+
+    def series(self, level: str, since: str, until: str, ids: Optional[List[str]] = None,
+               campaign_id: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Daily rows per entity between since and until (inclusive), oldest first"""
+        query = f"SELECT entity_id, date, final, {', '.join(SERIES_METRICS)} FROM daily_insights WHERE level = ? AND date >= ? AND date <= ?"
+        params: List[Any] = [level, since, until]
+        if ids:
+            query += f" AND entity_id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        if campaign_id:
+            query += " AND campaign_id = ?"
+            params.append(campaign_id)
+        query += " ORDER BY entity_id, date"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            point = dict(row)
+            point["final"] = bool(point["final"])
+            result.setdefault(point.pop("entity_id"), []).append(point)
+        return result
+
+
+    def changed_rows(self, cursor: Optional[tuple], limit: int = 500) -> List[Dict[str, Any]]:
+        """Rows stored or refetched after cursor, in fetch order
+
+        cursor is (fetched_at, level, entity_id, date) of the last row already
+        handled; pass the values of the last returned row to continue.
+        """
+        query = f"SELECT level, entity_id, date, fetched_at, {', '.join(SERIES_METRICS)} FROM daily_insights"
+        params: List[Any] = []
+        if cursor:
+            query += " WHERE (fetched_at, level, entity_id, date) > (?, ?, ?, ?)"
+            params.extend(cursor)
+        query += " ORDER BY fetched_at, level, entity_id, date LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_cursor(self, name: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, level, entity_id, date FROM rollup_push_cursor WHERE name = ?", (name,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def set_cursor(self, name: str, cursor: tuple):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rollup_push_cursor (name, fetched_at, level, entity_id, date) VALUES (?, ?, ?, ?, ?)",
+                (name, *cursor)
+            )
+
+    def get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM ingest_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_state(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ingest_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def fill_days(points: List[Dict[str, Any]], since: date, until: date) -> List[Dict[str, Any]]:
+    """Add zero rows for days without delivery so every series has one point per day"""
+    by_date = {p["date"]: p for p in points}
+    filled = []
+    day = since
+    while day <= until:
+        key = day.isoformat()
+        filled.append(by_date.get(key) or {"date": key, "final": None, **{m: 0 for m in SERIES_METRICS}})
+        day += timedelta(days=1)
+    return filled
+
+
+def compute_deltas(points: List[Dict[str, Any]], compare_days: int, stable_threshold: float = 0.05) -> Dict[str, Any]:
+    """Period-over-period change and trend per metric
+
+    Compares the sum of the last compare_days points with the compare_days
+    before them, and classifies the least-squares slope over the whole series
+    relative to its mean as increasing, decreasing or stable.
+    """
+    deltas = {}
+    for metric in SERIES_METRICS:
+        values = [float(p.get(metric) or 0) for p in points]
+        current = sum(values[-compare_days:]) if compare_days else 0.0
+        previous = sum(values[-2 * compare_days:-compare_days]) if compare_days and len(values) > compare_days else 0.0
+        percent_change = round(100.0 * (current - previous) / previous, 2) if previous else None
+
+        n = len(values)
+        mean = sum(values) / n if n else 0.0
+        if n >= 2 and mean:
+            x_mean = (n - 1) / 2
+            slope = sum((i - x_mean) * (v - mean) for i, v in enumerate(values)) / sum((i - x_mean) ** 2 for i in range(n))
+            relative_slope = slope / mean
+        else:
+            slope = relative_slope = 0.0
+        if relative_slope > stable_threshold:
+            trend = "increasing"
+        elif relative_slope < -stable_threshold:
+            trend = "decreasing"
+        else:
+            trend = "stable"
+
+        deltas[metric] = {
+            "current": round(current, 4),
+            "previous": round(previous, 4),
+            "percent_change": percent_change,
+            "slope": round(slope, 4),
+            "trend": trend
+        }
+    return deltas
+
+
+def rollup_rows(rows: List[Dict[str, Any]], currency: Optional[str]) -> List[Dict[str, Any]]:
+    """Daily rows in the shape the CRM's rollup ingestion expects"""
+    return [
+        {
+            "level": row["level"],
+            "meta_id": row["entity_id"],
+            "date": row["date"],
+            "impressions": row["impressions"],
+            "clicks": row["clicks"],
+            "spend_minor": to_minor_units(row["spend"], currency),
+            "conversions": row["conversions"]
+        }
+        for row in rows
+    ]
+
+
+def ingest_daily_insights(client, store: TimeSeriesStore, levels: List[str], today: date,
+                          lookback_days: int = 30, refresh_days: int = 3) -> Dict[str, int]:
+    """Fetch daily insights for every level, skipping days already final
+
+    The last refresh_days days (including today) are refetched on every run;
+    anything older is fetched once after it is first seen and then kept.
+    """
+    first_open_day = today - timedelta(days=refresh_days - 1)
+    counts = {}
+    for level in levels:
+        last_final = store.last_final_date(level)
+        if last_final:
+            since = min(date.fromisoformat(last_final) + timedelta(days=1), first_open_day)
+        else:
+            since = today - timedelta(days=lookback_days - 1)
+        rows = client.get_daily_insights(level, since.isoformat(), today.isoformat())
+        counts[level] = store.upsert(level, rows, first_open_day.isoformat())
+        logger.info(f"Ingested {counts[level]} daily {level} rows for {since.isoformat()}..{today.isoformat()}")
+    return counts
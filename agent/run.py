@@ -2,18 +2,23 @@
 """
 Standalone runner for the agent.
 Usage: python run.py
+
+Set AGENT_WORKERS to serve with several worker processes. One of them is
+elected leader and runs the background loops; the others only serve requests.
 """
+import os
 import sys
 from pathlib import Path
 
-# Add the app directory to the path
+# Add the agent and app directories to the path
+sys.path.insert(0, str(Path(__file__).parent))
 sys.path.insert(0, str(Path(__file__).parent / 'app'))
 
 if __name__ == "__main__":
-    from app.main import app
     import uvicorn
-    
-    print("Starting agent on http://0.0.0.0:9000")
-    print("Make sure the backend is running on http://localhost:8000")
-    uvicorn.run(app, host="0.0.0.0", port=9000)
 
+    workers = int(os.getenv("AGENT_WORKERS", "1"))
+    print(f"Starting agent on http://0.0.0.0:9000 with {workers} worker(s)")
+    print("Make sure the backend is running on http://localhost:8000")
+    # Pass the app as an import string so each worker process imports and initializes it
+    uvicorn.run("app.main:app", host="0.0.0.0", port=9000, workers=workers)
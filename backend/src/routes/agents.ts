@@ -1,6 +1,6 @@
 import { Router, Response } from 'express';
 import { body, validationResult } from 'express-validator';
-import { Agent, AdAccount, Command, CommandResult } from '../models';
+import { Agent, AdAccount, Command, CommandResult, DailyMetric, Campaign, AdSet, Ad } from '../models';
 import { authenticate, requireRoles, AuthRequest } from '../middleware/auth';
 import { generateId } from '../utils';
 import { createToken } from '../utils/security';
@@ -318,6 +318,144 @@ router.post('/:agent_id/commands:pull', async (req: AuthRequest, res: Response)
   }
 });
 
+// Ingest daily rollups computed by the agent from its insights history
+// Each row is one entity (campaign, ad set or ad) on one day in the ad account's timezone
+const ROLLUP_LEVELS: Record<string, { model: any; prefix: string; field: 'campaign_id' | 'ad_set_id' | 'ad_id' }> = {
+  campaign: { model: Campaign, prefix: 'campaign', field: 'campaign_id' },
+  adset: { model: AdSet, prefix: 'ad_set', field: 'ad_set_id' },
+  ad: { model: Ad, prefix: 'ad', field: 'ad_id' },
+};
+const MAX_ROLLUP_ROWS = 1000;
+
+router.post('/:agent_id/metrics:daily', [
+  body('meta_ad_account_id').notEmpty(),
+  body('rows').isArray({ max: MAX_ROLLUP_ROWS }),
+  body('rows.*.level').isIn(Object.keys(ROLLUP_LEVELS)),
+  body('rows.*.meta_id').notEmpty(),
+  body('rows.*.date').isISO8601(),
+], async (req: AuthRequest, res: Response) => {
+  try {
+    const errors = validationResult(req);
+    if (!errors.isEmpty()) {
+      return res.status(400).json({ errors: errors.array() });
+    }
+
+    const { agent_id } = req.params;
+    const { meta_ad_account_id, rows } = req.body;
+
+    // Verify agent token
+    const authHeader = req.headers.authorization;
+    if (!authHeader || !authHeader.startsWith('Bearer ')) {
+      return res.status(401).json({ detail: 'Missing token' });
+    }
+
+    const token = authHeader.substring(7);
+    const agent = await Agent.findOne({ id: agent_id });
+    if (!agent) {
+      return res.status(404).json({ detail: 'Agent not found' });
+    }
+
+    if (!agent.token_hash) {
+      return res.status(401).json({ detail: 'Agent not provisioned' });
+    }
+
+    const tokenOk = await bcrypt.compare(token, agent.token_hash);
+    if (!tokenOk) {
+      return res.status(401).json({ detail: 'Invalid agent token' });
+    }
+
+    const rawAccountId = String(meta_ad_account_id).replace(/^act_/, '');
+    const account = await AdAccount.findOne({
+      agent_id,
+      meta_ad_account_id: { $in: [rawAccountId, `act_${rawAccountId}`] },
+    });
+    if (!account) {
+      return res.status(404).json({ detail: 'Ad account not found' });
+    }
+
+    // Resolve Meta ids to CRM entity ids with one query per level, creating
+    // minimal records for entities the CRM hasn't seen yet (like /api/ingest/metrics does)
+    const entityIds: Record<string, Map<string, string>> = {};
+    for (const [level, { model, prefix }] of Object.entries(ROLLUP_LEVELS)) {
+      const metaIds = [...new Set<string>(rows.filter((r: any) => r.level === level).map((r: any) => String(r.meta_id)))];
+      entityIds[level] = new Map();
+      if (metaIds.length === 0) continue;
+
+      const existing = await model.find({ ad_account_id: account.id, meta_id: { $in: metaIds } }, { id: 1, meta_id: 1 });
+      for (const entity of existing) {
+        entityIds[level].set(entity.meta_id, entity.id);
+      }
+
+      const missing = metaIds.filter(metaId => !entityIds[level].has(metaId));
+      if (missing.length > 0) {
+        await model.bulkWrite(missing.map(metaId => ({
+          updateOne: {
+            filter: { id: `${prefix}_${metaId}` },
+            update: {
+              $setOnInsert: {
+                id: `${prefix}_${metaId}`,
+                user_id: account.user_id,
+                ad_account_id: account.id,
+                meta_id: metaId,
+                name: metaId,
+                status: 'UNKNOWN',
+              },
+            },
+            upsert: true,
+          },
+        })), { ordered: false });
+        for (const metaId of missing) {
+          entityIds[level].set(metaId, `${prefix}_${metaId}`);
+        }
+      }
+    }
+
+    // Same id scheme as the retention loop, so a day aggregated from snapshots and
+    // the agent's rollup for it end up in the same document
+    const operations = rows.map((row: any) => {
+      const { field } = ROLLUP_LEVELS[row.level];
+      const day = String(row.date).slice(0, 10);
+      const keys = { campaign_id: undefined as string | undefined, ad_set_id: undefined as string | undefined, ad_id: undefined as string | undefined };
+      keys[field] = entityIds[row.level].get(String(row.meta_id));
+      const dailyId = `dm_${account.user_id}_${account.id}_${day}_${keys.campaign_id || '0'}_${keys.ad_set_id || '0'}_${keys.ad_id || '0'}`;
+
+      return {
+        updateOne: {
+          filter: { id: dailyId },
+          update: {
+            $set: {
+              id: dailyId,
+              user_id: account.user_id,
+              ad_account_id: account.id,
+              ...keys,
+              date: new Date(`${day}T00:00:00.000Z`),
+              impressions: Number(row.impressions) || 0,
+              clicks: Number(row.clicks) || 0,
+              spend_minor: Math.round(Number(row.spend_minor) || 0),
+              conversions: Number(row.conversions) || 0,
+            },
+          },
+          upsert: true,
+        },
+      };
+    });
+
+    const result = operations.length > 0
+      ? await DailyMetric.bulkWrite(operations, { ordered: false })
+      : null;
+
+    res.json({
+      ok: true,
+      received: rows.length,
+      upserted: result?.upsertedCount || 0,
+      modified: result?.modifiedCount || 0,
+    });
+  } catch (error) {
+    console.error('Ingest daily rollups error:', error);
+    res.status(500).json({ detail: 'Internal server error' });
+  }
+});
+
 // Submit command result - need to verify agent differently
 router.post('/commands/:command_id/result', async (req: AuthRequest, res: Response) => {
   try {
@@ -6,6 +6,11 @@ import axios from 'axios';
 
 const router = Router();
 
+// Last response per agent URL, revalidated with If-None-Match so unchanged
+// agent data comes back as a bodyless 304
+const AGENT_RESPONSE_CACHE_SIZE = 200;
+const agentResponseCache = new Map<string, { etag: string; data: any }>();
+
 async function getAgentMetaData(agentId: string, endpoint: string): Promise<any> {
   const agent = await Agent.findOne({ id: agentId });
   
@@ -19,7 +24,26 @@ async function getAgentMetaData(agentId: string, endpoint: string): Promise<any>
 
   try {
     const agentUrl = `${config.agent.baseUrl}/meta/${endpoint}`;
-    const response = await axios.get(agentUrl, { timeout: 10000 });
+    const cached = agentResponseCache.get(agentUrl);
+    const response = await axios.get(agentUrl, {
+      timeout: 10000,
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+
+    const etag = response.headers['etag'];
+    if (etag) {
+      agentResponseCache.delete(agentUrl);
+      if (agentResponseCache.size >= AGENT_RESPONSE_CACHE_SIZE) {
+        // Map preserves insertion order, so the first key is the least recently stored
+        agentResponseCache.delete(agentResponseCache.keys().next().value as string);
+      }
+      agentResponseCache.set(agentUrl, { etag, data: response.data });
+    }
     return response.data;
   } catch (error: any) {
     if (error.code === 'ECONNABORTED') {
@@ -184,16 +208,29 @@ router.get('/insights', authenticate, requireRoles('USER', 'ADMIN'), async (req:
   }
 });
 
+// Query parameters passed through to the agent's hierarchical endpoint
+const HIERARCHY_QUERY_PARAMS = [
+  'date_preset', 'levels', 'fields', 'metrics', 'effective_status', 'campaign_ids', 'name', 'updated_since',
+  'page_size', 'cursor',
+];
+
 // Get hierarchical campaigns
 router.get('/campaigns/hierarchical', authenticate, requireRoles('USER', 'ADMIN'), async (req: AuthRequest, res: Response) => {
   try {
-    const { agent_id, date_preset } = req.query;
+    const { agent_id } = req.query;
     if (!agent_id || typeof agent_id !== 'string') {
       return res.status(400).json({ detail: 'agent_id is required' });
     }
-    const datePreset = typeof date_preset === 'string' ? date_preset : 'last_30d';
-    const endpoint = date_preset ? `campaigns/hierarchical?date_preset=${datePreset}` : 'campaigns/hierarchical';
-    const data = await getAgentMetaData(agent_id, endpoint);
+    // Filters and paging are applied by the agent, so only the requested page is transferred
+    const params = new URLSearchParams();
+    for (const key of HIERARCHY_QUERY_PARAMS) {
+      const value = req.query[key];
+      if (typeof value === 'string' && value !== '') {
+        params.set(key, value);
+      }
+    }
+    const query = params.toString();
+    const data = await getAgentMetaData(agent_id, query ? `campaigns/hierarchical?${query}` : 'campaigns/hierarchical');
     res.json(data);
   } catch (error: any) {
     if (error.message === 'Agent not found') {
@@ -50,28 +50,33 @@ async function aggregateOldSnapshots() {
       group.conversions += snapshot.conversions;
     }
 
-    // Upsert daily metrics
-    for (const [key, data] of grouped) {
+    // Upsert daily metrics in one round trip
+    const operations = [...grouped.values()].map(data => {
       const dailyId = `dm_${data.user_id}_${data.ad_account_id}_${data.date.toISOString().split('T')[0]}_${data.campaign_id || '0'}_${data.ad_set_id || '0'}_${data.ad_id || '0'}`;
 
-      await DailyMetric.findOneAndUpdate(
-        { id: dailyId },
-        {
-          id: dailyId,
-          user_id: data.user_id,
-          ad_account_id: data.ad_account_id,
-          campaign_id: data.campaign_id,
-          ad_set_id: data.ad_set_id,
-          ad_id: data.ad_id,
-          date: data.date,
-          impressions: data.impressions,
-          clicks: data.clicks,
-          spend_minor: data.spend_minor,
-          conversions: data.conversions,
+      return {
+        updateOne: {
+          filter: { id: dailyId },
+          update: {
+            $set: {
+              id: dailyId,
+              user_id: data.user_id,
+              ad_account_id: data.ad_account_id,
+              campaign_id: data.campaign_id,
+              ad_set_id: data.ad_set_id,
+              ad_id: data.ad_id,
+              date: data.date,
+              impressions: data.impressions,
+              clicks: data.clicks,
+              spend_minor: data.spend_minor,
+              conversions: data.conversions,
+            },
+          },
+          upsert: true,
         },
-        { upsert: true, new: true }
-      );
-    }
+      };
+    });
+    await DailyMetric.bulkWrite(operations, { ordered: false });
 
     // Delete old snapshots
     const idsToDelete = snapshots.map(s => s.id);
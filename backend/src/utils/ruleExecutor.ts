@@ -2,6 +2,9 @@ import axios from 'axios';
 import { Agent } from '../models';
 import { config } from '../config';
 
+// Lets the agent schedule rule traffic below interactive UI requests
+const RULE_REQUEST_HEADERS = { 'X-Request-Priority': 'rule' };
+
 // All available operators
 export type Operator = 
   // Basic operators
@@ -423,7 +426,7 @@ export async function executeRule(rule: any): Promise<any> {
   const agentUrl = `${config.agent.baseUrl}/meta/campaigns/${rule.campaign_id}/adsets`;
   let adSetsResponse;
   try {
-    adSetsResponse = await axios.get(agentUrl, { timeout: 15000 });
+    adSetsResponse = await axios.get(agentUrl, { timeout: 15000, headers: RULE_REQUEST_HEADERS });
   } catch (error: any) {
     if (error.code === 'ECONNABORTED') {
       throw new Error('Agent request timed out');
@@ -454,7 +457,7 @@ export async function executeRule(rule: any): Promise<any> {
       const newStatus = rule.action.type === 'PAUSE' ? 'PAUSED' : 'ACTIVE';
       const updateUrl = `${config.agent.baseUrl}/meta/adsets/${adSet.id}/status`;
       
-      const response = await axios.put(updateUrl, { status: newStatus }, { timeout: 10000 });
+      const response = await axios.put(updateUrl, { status: newStatus }, { timeout: 10000, headers: RULE_REQUEST_HEADERS });
       
       // Check for application-level errors in the response
       if (response.data && response.data.status === 'error') {